@@ -5,13 +5,11 @@ This file serves as the main entry point for Railway deployment.
 """
 
 import os
-import sys
 
-# Add the current directory to Python path
-sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+# Build the Flask app from the factory in src/main.py
+from src.main import create_app
 
-# Import the Flask app from src/main.py
-from src.main import app
+app = create_app()
 
 if __name__ == '__main__':
     # Get port from environment variable (Railway sets this automatically)
@@ -0,0 +1,28 @@
+"""
+Gunicorn configuration for LeadDB.
+Used by the Procfile and railway.json start commands.
+"""
+
+import os
+
+# Railway sets PORT automatically
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+
+# Gunicorn's (2 x cores) + 1 rule of thumb, overridable per deployment
+if hasattr(os, 'sched_getaffinity'):
+    cores = len(os.sched_getaffinity(0))
+else:
+    cores = os.cpu_count() or 1
+workers = int(os.environ.get('WEB_CONCURRENCY', cores * 2 + 1))
+
+# Threaded workers: the API is I/O bound (Postgres, outbound scraping) and
+# psycopg2 would block a gevent loop without extra monkey-patching
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', '4'))
+
+# Lead generation requests scrape several sites synchronously
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '120'))
+keepalive = 5
+
+accesslog = '-'
+errorlog = '-'
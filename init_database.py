@@ -4,23 +4,28 @@ Database Initialization Script for LeadDB
 Creates tables and populates with sample data
 """
 
+import logging
 import os
-import sys
-from datetime import datetime
+from datetime import datetime, timezone
+from sqlalchemy import insert, text
 
-# Add src to path
-sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
-
-from src.main import app
+from src.main import create_app, create_missing_tables
 from src.models.user import db
 from src.models.company import Company
 from src.models.contact import Contact
 from src.models.lead_list import LeadList, LeadListContact
 
+logger = logging.getLogger("leaddb.init")
+
 def create_sample_data():
     """Create sample companies and contacts for demonstration"""
     
-    print("🏢 Creating sample companies...")
+    logger.info("🏢 Creating sample companies...")
+    
+    # One timestamp for the whole seed instead of a datetime.utcnow() default per row,
+    # naive UTC like the columns and those defaults
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    timestamps = {"created_at": now, "updated_at": now}
     
     # Sample companies
     companies_data = [
@@ -100,22 +105,20 @@ def create_sample_data():
         }
     ]
     
-    created_companies = []
-    for company_data in companies_data:
-        company = Company(**company_data)
-        db.session.add(company)
-        created_companies.append(company)
-    
-    db.session.flush()  # Get IDs for companies
-    print(f"✅ Created {len(created_companies)} companies")
+    # Single executemany INSERT ... RETURNING, ids come back in parameter order
+    company_ids = db.session.execute(
+        insert(Company).returning(Company.id, sort_by_parameter_order=True),
+        [{**company_data, **timestamps} for company_data in companies_data]
+    ).scalars().all()
+    logger.info(f"✅ Created {len(company_ids)} companies")
     
-    print("👥 Creating sample contacts...")
+    logger.info("👥 Creating sample contacts...")
     
     # Sample contacts
     contacts_data = [
         # TechVision AI contacts
         {
-            "company_id": created_companies[0].id,
+            "company_id": company_ids[0],
             "first_name": "Alex",
             "last_name": "Chen",
             "email": "alex.chen@techvision.ai",
@@ -129,7 +132,7 @@ def create_sample_data():
             "location_city": "San Francisco"
         },
         {
-            "company_id": created_companies[0].id,
+            "company_id": company_ids[0],
             "first_name": "Maria",
             "last_name": "Rodriguez",
             "email": "maria.rodriguez@techvision.ai",
@@ -144,7 +147,7 @@ def create_sample_data():
         },
         # GrowthMarketing Pro contacts
         {
-            "company_id": created_companies[1].id,
+            "company_id": company_ids[1],
             "first_name": "David",
             "last_name": "Kim",
             "email": "david.kim@growthmarketing.pro",
@@ -158,7 +161,7 @@ def create_sample_data():
             "location_city": "Austin"
         },
         {
-            "company_id": created_companies[1].id,
+            "company_id": company_ids[1],
             "first_name": "Sarah",
             "last_name": "Johnson",
             "email": "sarah.johnson@growthmarketing.pro",
@@ -173,7 +176,7 @@ def create_sample_data():
         },
         # CloudScale Solutions contacts
         {
-            "company_id": created_companies[2].id,
+            "company_id": company_ids[2],
             "first_name": "Michael",
             "last_name": "Thompson",
             "email": "michael.thompson@cloudscale.io",
@@ -187,7 +190,7 @@ def create_sample_data():
             "location_city": "Seattle"
         },
         {
-            "company_id": created_companies[2].id,
+            "company_id": company_ids[2],
             "first_name": "Jennifer",
             "last_name": "Lee",
             "email": "jennifer.lee@cloudscale.io",
@@ -202,7 +205,7 @@ def create_sample_data():
         },
         # DataInsights Corp contacts
         {
-            "company_id": created_companies[3].id,
+            "company_id": company_ids[3],
             "first_name": "Robert",
             "last_name": "Wilson",
             "email": "robert.wilson@datainsights.com",
@@ -216,7 +219,7 @@ def create_sample_data():
             "location_city": "New York"
         },
         {
-            "company_id": created_companies[3].id,
+            "company_id": company_ids[3],
             "first_name": "Emily",
             "last_name": "Davis",
             "email": "emily.davis@datainsights.com",
@@ -231,7 +234,7 @@ def create_sample_data():
         },
         # EcoTech Innovations contacts
         {
-            "company_id": created_companies[4].id,
+            "company_id": company_ids[4],
             "first_name": "James",
             "last_name": "Green",
             "email": "james.green@ecotech.green",
@@ -245,7 +248,7 @@ def create_sample_data():
             "location_city": "Palo Alto"
         },
         {
-            "company_id": created_companies[4].id,
+            "company_id": company_ids[4],
             "first_name": "Lisa",
             "last_name": "Brown",
             "email": "lisa.brown@ecotech.green",
@@ -260,18 +263,20 @@ def create_sample_data():
         }
     ]
     
-    created_contacts = []
-    for contact_data in contacts_data:
-        contact = Contact(**contact_data)
-        # Calculate lead score
-        contact.lead_score = contact.calculate_lead_score()
-        db.session.add(contact)
-        created_contacts.append(contact)
+    for contact_data, lead_score in zip(contacts_data, Contact.bulk_score(contacts_data)):
+        contact_data["lead_score"] = lead_score
+        contact_data.update(timestamps)
     
-    db.session.flush()  # Get IDs for contacts
-    print(f"✅ Created {len(created_contacts)} contacts")
+    contact_ids = db.session.execute(
+        insert(Contact).returning(Contact.id, sort_by_parameter_order=True),
+        contacts_data
+    ).scalars().all()
+    for contact_data, contact_id in zip(contacts_data, contact_ids):
+        contact_data["id"] = contact_id
+    created_contacts = contacts_data
+    logger.info(f"✅ Created {len(created_contacts)} contacts")
     
-    print("📋 Creating sample lead lists...")
+    logger.info("📋 Creating sample lead lists...")
     
     # Create sample lead lists
     lead_lists_data = [
@@ -289,78 +294,81 @@ def create_sample_data():
         }
     ]
     
-    created_lists = []
-    for list_data in lead_lists_data:
-        lead_list = LeadList(**list_data)
-        db.session.add(lead_list)
-        created_lists.append(lead_list)
+    list_ids = db.session.execute(
+        insert(LeadList).returning(LeadList.id, sort_by_parameter_order=True),
+        [{**list_data, **timestamps} for list_data in lead_lists_data]
+    ).scalars().all()
     
-    db.session.flush()  # Get IDs for lists
+    # Add contacts to lists in a single pass over the contacts
+    tech_ceos_id, marketing_id, high_value_id = list_ids
+    list_contacts = []
+    for contact in created_contacts:
+        # Tech CEOs list - add all CEOs
+        if 'CEO' in contact["job_title"]:
+            list_contacts.append({"list_id": tech_ceos_id, "contact_id": contact["id"], "added_at": now})
+        # Marketing Decision Makers - add marketing contacts
+        if 'Marketing' in contact["department"] or 'Marketing' in contact["job_title"]:
+            list_contacts.append({"list_id": marketing_id, "contact_id": contact["id"], "added_at": now})
+        # High-Value Prospects - add contacts with lead score > 80
+        if contact["lead_score"] > 80:
+            list_contacts.append({"list_id": high_value_id, "contact_id": contact["id"], "added_at": now})
     
-    # Add contacts to lists
-    # Tech CEOs list - add all CEOs
-    ceo_contacts = [c for c in created_contacts if 'CEO' in c.job_title]
-    for contact in ceo_contacts:
-        list_contact = LeadListContact(list_id=created_lists[0].id, contact_id=contact.id)
-        db.session.add(list_contact)
+    db.session.execute(insert(LeadListContact), list_contacts)
     
-    # Marketing Decision Makers - add marketing contacts
-    marketing_contacts = [c for c in created_contacts if 'Marketing' in c.department or 'Marketing' in c.job_title]
-    for contact in marketing_contacts:
-        list_contact = LeadListContact(list_id=created_lists[1].id, contact_id=contact.id)
-        db.session.add(list_contact)
+    logger.info(f"✅ Created {len(list_ids)} lead lists")
     
-    # High-Value Prospects - add contacts with lead score > 80
-    high_value_contacts = [c for c in created_contacts if c.lead_score > 80]
-    for contact in high_value_contacts:
-        list_contact = LeadListContact(list_id=created_lists[2].id, contact_id=contact.id)
-        db.session.add(list_contact)
-    
-    print(f"✅ Created {len(created_lists)} lead lists")
-    
-    return created_companies, created_contacts, created_lists
+    return company_ids, created_contacts, list_ids
 
 def main():
     """Initialize database with tables and sample data"""
-    print("🚀 Initializing LeadDB Database")
-    print("=" * 50)
+    logger.info("🚀 Initializing LeadDB Database")
+    logger.info("=" * 50)
     
+    app = create_app()
     with app.app_context():
         try:
             # Create all tables
-            print("📊 Creating database tables...")
-            db.create_all()
-            print("✅ Database tables created successfully")
-            
-            # Check if data already exists
-            existing_companies = Company.query.count()
-            if existing_companies > 0:
-                print(f"ℹ️  Database already contains {existing_companies} companies")
-                print("Skipping sample data creation")
-                return
-            
-            # Create sample data
-            companies, contacts, lists = create_sample_data()
+            logger.info("📊 Creating database tables...")
+            create_missing_tables()
+            logger.info("✅ Database tables created successfully")
             
-            # Commit all changes
-            db.session.commit()
+            # Check and seed inside one transaction: a single COMMIT (and fsync)
+            # for the whole run, rolled back automatically on error
+            with db.session.begin():
+                if db.engine.dialect.name == "sqlite":
+                    # One-shot seeding: worst case on a crash is re-running this script
+                    db.session.execute(text("PRAGMA synchronous=OFF"))
+                    db.session.execute(text("PRAGMA journal_mode=MEMORY"))
+                
+                # Check if data already exists
+                existing_companies = Company.query.count()
+                if existing_companies > 0:
+                    logger.info(f"ℹ️  Database already contains {existing_companies} companies")
+                    logger.info("Skipping sample data creation")
+                    return
+                
+                # Create sample data
+                companies, contacts, lists = create_sample_data()
             
-            print("\n🎉 Database initialization completed successfully!")
-            print("\n📊 Summary:")
-            print(f"   • Companies: {len(companies)}")
-            print(f"   • Contacts: {len(contacts)}")
-            print(f"   • Lead Lists: {len(lists)}")
+            logger.info("🎉 Database initialization completed successfully!")
+            logger.info("📊 Summary:")
+            logger.info(f"   • Companies: {len(companies)}")
+            logger.info(f"   • Contacts: {len(contacts)}")
+            logger.info(f"   • Lead Lists: {len(lists)}")
             
-            print("\n🔗 Next steps:")
-            print("   1. Start the Flask server: python src/main.py")
-            print("   2. Access the API at: http://localhost:5000")
-            print("   3. Test endpoints: http://localhost:5000/api")
+            logger.info("🔗 Next steps:")
+            logger.info("   1. Start the Flask server: python src/main.py")
+            logger.info("   2. Access the API at: http://localhost:5000")
+            logger.info("   3. Test endpoints: http://localhost:5000/api")
             
         except Exception as e:
-            print(f"❌ Error initializing database: {e}")
-            db.session.rollback()
+            logger.error(f"❌ Error initializing database: {e}")
             raise
 
 if __name__ == "__main__":
+    logging.basicConfig(
+        level=os.environ.get("LOG_LEVEL", "INFO"),
+        format="%(asctime)s %(levelname)s %(message)s"
+    )
     main()
 
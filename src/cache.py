@@ -0,0 +1,45 @@
+from flask_caching import Cache
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+# Response cache for hot read endpoints, configured in create_app()
+cache = Cache()
+
+def is_success(rv):
+    """response_filter for cache.cached(): error views return (body, status) tuples"""
+    return not isinstance(rv, tuple)
+
+# Cached responses embed counts and rows from every table, so any committed write
+# drops the whole cache: connections flag INSERT/UPDATE/DELETE statements, and
+# the session clears the cache once its transaction has committed. The Engine
+# 'commit' event fires before the database commit, when a concurrent request
+# could still read and re-cache the old data.
+#
+# Only a shared (Redis) cache is cleared for every worker. With the per-process
+# SimpleCache the other workers keep their entries until they expire, so every
+# cached view keeps a short timeout
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _flag_write(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and (context.isinsert or context.isupdate or context.isdelete):
+        conn.info['cache_stale'] = True
+
+@event.listens_for(Engine, 'rollback')
+def _discard(conn):
+    conn.info.pop('cache_stale', None)
+
+@event.listens_for(Session, 'after_begin')
+def _track_connection(session, transaction, connection):
+    session.info.setdefault('cache_connections', []).append(connection)
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate(session):
+    # Pop every connection's flag, not just the first one set
+    stale = [connection.info.pop('cache_stale', False) for connection in session.info.pop('cache_connections', ())]
+    if any(stale):
+        cache.clear()
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_connections(session):
+    session.info.pop('cache_connections', None)
@@ -0,0 +1,36 @@
+from flask.json.provider import DefaultJSONProvider
+import orjson
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider backed by orjson
+    datetime/date/time values are rendered natively in ISO 8601 (the format the
+    models' to_dict() used to produce with isoformat()); decimals, UUIDs and
+    dataclasses are still handed to Flask's default hook
+    """
+    options = orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_NON_STR_KEYS
+
+    def _option(self):
+        return self.options | orjson.OPT_SORT_KEYS if self.sort_keys else self.options
+
+    def dumps_bytes(self, obj):
+        """Serialize obj straight to UTF-8 bytes"""
+        return orjson.dumps(obj, default=self.default, option=self._option())
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return self.dumps_bytes(obj).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj), mimetype=self.mimetype)
+
+def constant_json(obj):
+    """Serialize a constant response body once, at import time"""
+    return orjson.dumps(obj)
@@ -1,70 +1,261 @@
+import hashlib
+import importlib
+import io
 import os
 import sys
-from flask import Flask, send_from_directory
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+import click
+from flask import Blueprint, Flask, Response, current_app, send_file, send_from_directory
 from flask_cors import CORS
+from sqlalchemy import inspect, select, text
+from werkzeug.security import safe_join
+from whitenoise import WhiteNoise
 
-# Add the project root to Python path
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Paths resolved once at import
+BASE_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = BASE_DIR.parent
+STATIC_DIR = BASE_DIR / 'static'
+SQLITE_DB_PATH = BASE_DIR / 'database' / 'app.db'
+
+# Running as `python src/main.py` puts src/ rather than the project root on the path
+if not __package__:
+    sys.path.insert(0, str(PROJECT_ROOT))
 
 # Import database and models
 from src.models.user import db
 from src.models.company import Company
 from src.models.contact import Contact
 from src.models.lead_list import LeadList, LeadListContact, SavedSearch
+from src.json_provider import OrjsonProvider, constant_json
+from src.cache import cache
+
+# Route blueprints as (module, blueprint name, url prefix), imported on registration
+BLUEPRINTS = (
+    ('src.routes.api', 'api_bp', '/api'),
+    ('src.routes.user', 'user_bp', '/api/users'),
+    ('src.routes.companies', 'companies_bp', '/api'),
+    ('src.routes.contacts', 'contacts_bp', '/api'),
+    ('src.routes.lead_lists', 'lead_lists_bp', '/api'),
+    ('src.routes.export', 'export_bp', '/api'),
+    ('src.routes.lead_generation', 'lead_gen_bp', '/api/leads'),
+)
 
-# Import all route blueprints
-from src.routes.api import api_bp
-from src.routes.user import user_bp
-from src.routes.companies import companies_bp
-from src.routes.contacts import contacts_bp
-from src.routes.lead_lists import lead_lists_bp
-from src.routes.export import export_bp
-from src.routes.lead_generation import lead_gen_bp
+# /api/init-database INSERT statements, built once so SQLAlchemy's per-engine
+# compiled cache finds the same statement (and its compiled SQL) on every call
+_INSERT_COMPANIES = Company.__table__.insert().returning(Company.__table__.c.id, sort_by_parameter_order=True)
+_INSERT_CONTACTS = Contact.__table__.insert().returning(Contact.__table__.c.id, sort_by_parameter_order=True)
+_INSERT_LEAD_LIST = LeadList.__table__.insert().returning(LeadList.__table__.c.id)
+_INSERT_LIST_CONTACTS = LeadListContact.__table__.insert()
 
-app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
+# pg_advisory_xact_lock() key serializing concurrent /api/init-database calls
+_SEED_LOCK_KEY = 0x1EADDB
 
-# Configuration
-app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
+# Application-level routes (health check, seeding, frontend) and CLI commands
+core_bp = Blueprint('core', __name__, cli_group=None)
 
-# Database configuration - supports both PostgreSQL (production) and SQLite (development)
-database_url = os.environ.get('DATABASE_URL')
-if database_url:
-    # Production: Use PostgreSQL from Railway/Render
-    if database_url.startswith('postgres://'):
-        database_url = database_url.replace('postgres://', 'postgresql://', 1)
-    app.config['SQLALCHEMY_DATABASE_URI'] = database_url
-else:
-    # Development: Use SQLite
-    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+# Constant response bodies, serialized once
+_HEALTH_JSON = constant_json({'status': 'healthy', 'service': 'leaddb-backend'})
+_NOT_DEPLOYED_JSON = constant_json({
+    'message': 'LeadDB Backend API',
+    'status': 'running',
+    'frontend': 'not_deployed',
+    'api_docs': '/api'
+})
+_NOT_FOUND_JSON = constant_json({'error': 'File not found'})
 
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# index.html kept in memory as path -> (bytes, etag, mtime), re-read when the file changes
+_index_cache = {}
 
-# Enable CORS for all routes
-CORS(app, origins=['*'])
+def create_app():
+    """Create and configure the LeadDB Flask application"""
+    app = Flask(__name__, static_folder=STATIC_DIR)
+    app.json = OrjsonProvider(app)
+    
+    # Configuration
+    app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
+    
+    # Database configuration - supports both PostgreSQL (production) and SQLite (development)
+    database_url = os.environ.get('DATABASE_URL')
+    if database_url:
+        # Production: Use PostgreSQL from Railway/Render
+        if database_url.startswith('postgres://'):
+            database_url = database_url.replace('postgres://', 'postgresql://', 1)
+        app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+        if database_url.startswith('postgresql'):
+            app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+                # Let psycopg2 batch executemany() calls (bulk INSERT/UPDATE) into few round trips
+                'executemany_mode': 'values_plus_batch',
+                # Rows per multi-row INSERT ... VALUES of a bulk insert (SQLAlchemy's
+                # default is 1000): a 5000-row import chunk goes out as one statement
+                'insertmanyvalues_page_size': int(os.environ.get('DB_INSERT_PAGE_SIZE', 10000)),
+                # One pool per gunicorn worker: size it to the worker's threads, not the
+                # whole deployment, so workers x (size + overflow) stays under max_connections
+                'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+                'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 5)),
+                # Fail a request whose thread can't get a connection within this many
+                # seconds instead of holding it for the 30s default
+                'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+                # Reuse the most recent connection and transparently replace ones the
+                # server or a proxy closed while idle
+                'pool_use_lifo': True,
+                'pool_pre_ping': True,
+                'pool_recycle': 1800,
+                'connect_args': {
+                    'options': f"-c statement_timeout={int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 15000))}"
+                }
+            }
+            if os.environ.get('DB_SSLMODE'):
+                app.config['SQLALCHEMY_ENGINE_OPTIONS']['connect_args']['sslmode'] = os.environ['DB_SSLMODE']
+    else:
+        # Development: Use SQLite
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{SQLITE_DB_PATH}"
+    
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    
+    # Size of the per-engine LRU cache of compiled statements
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})['query_cache_size'] = int(
+        os.environ.get('DB_QUERY_CACHE_SIZE', 1200)
+    )
+    
+    # Enable CORS for the API only, for the origins listed in CORS_ORIGINS
+    # (comma-separated, '*' when unset); browsers cache preflights for a day
+    cors_origins = [origin.strip() for origin in os.environ.get('CORS_ORIGINS', '*').split(',') if origin.strip()]
+    CORS(app, resources={r'/api/*': {'origins': cors_origins}}, max_age=86400)
+    
+    # Serve the built frontend with WhiteNoise in front of Flask: files are indexed
+    # once at startup and sent with ETag/Cache-Control headers (CDN friendly) without
+    # tying up a Flask view; fingerprinted build assets are cached for a year
+    app.wsgi_app = WhiteNoise(
+        app.wsgi_app,
+        root=app.static_folder,
+        max_age=int(os.environ.get('STATIC_MAX_AGE', 60)),
+        immutable_file_test=r'[.-][A-Za-z0-9_]{8,}\.(?:js|mjs|css|map|woff2?|png|jpe?g|gif|svg|webp)$',
+        autorefresh=os.environ.get('FLASK_ENV') == 'development'
+    )
+    
+    # Initialize database
+    db.init_app(app)
+    
+    # Response cache: Redis when CACHE_REDIS_URL is set (shared by all workers and
+    # invalidated for all of them), otherwise in-process memory per worker, where
+    # a write clears only the writing worker's cache and the short timeouts of
+    # the cached views bound how stale the others get
+    cache_redis_url = os.environ.get('CACHE_REDIS_URL')
+    if cache_redis_url:
+        app.config.update(CACHE_TYPE='RedisCache', CACHE_REDIS_URL=cache_redis_url)
+    else:
+        app.config['CACHE_TYPE'] = 'SimpleCache'
+    app.config['CACHE_KEY_PREFIX'] = 'leaddb:'
+    cache.init_app(app)
+    
+    # Register all blueprints
+    app.register_blueprint(core_bp)
+    for module_name, blueprint_name, url_prefix in BLUEPRINTS:
+        module = importlib.import_module(module_name)
+        app.register_blueprint(getattr(module, blueprint_name), url_prefix=url_prefix)
+    
+    return app
 
-# Initialize database
-db.init_app(app)
+def create_missing_tables():
+    """Create the tables that don't exist yet and return their names"""
+    # One catalog query for all existing table names instead of a has_table()
+    # round trip per model, then CREATE without checking each table again
+    with db.engine.begin() as conn:
+        inspector = inspect(conn)
+        existing = set(inspector.get_table_names())
+        missing = [table for table in db.metadata.sorted_tables if table.name not in existing]
+        if missing:
+            db.metadata.create_all(conn, tables=missing, checkfirst=False)
+        
+        # Tables that already existed still get indexes added to the models since
+        if existing:
+            indexed = {
+                index['name']
+                for (_, table_name), indexes in inspector.get_multi_indexes().items()
+                for index in indexes
+            }
+            for table in db.metadata.sorted_tables:
+                if table.name in existing:
+                    for index in table.indexes:
+                        if index.name not in indexed:
+                            index.create(conn)
+    return [table.name for table in missing]
 
-# Register all blueprints
-app.register_blueprint(api_bp, url_prefix='/api')
-app.register_blueprint(user_bp, url_prefix='/api/users')
-app.register_blueprint(companies_bp, url_prefix='/api')
-app.register_blueprint(contacts_bp, url_prefix='/api')
-app.register_blueprint(lead_lists_bp, url_prefix='/api')
-app.register_blueprint(export_bp, url_prefix='/api')
-app.register_blueprint(lead_gen_bp, url_prefix='/api/leads')
+@core_bp.cli.command('init-db')
+def init_db_command():
+    """Create missing database tables (run once per deploy: flask --app app init-db)"""
+    created = create_missing_tables()
+    click.echo(f"✅ Database tables created successfully ({len(created)} new)")
 
 # Health check endpoint
-@app.route('/health')
+@core_bp.route('/health')
 def health_check():
-    return {'status': 'healthy', 'service': 'leaddb-backend'}
+    return Response(_HEALTH_JSON, mimetype='application/json')
+
 
 
+def _copy_text(value):
+    """Encode a value for COPY's text format"""
+    if value is None:
+        return '\\N'
+    return (str(value).replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+def _bulk_load(insert_stmt, rows, key_column=None):
+    """
+    Load rows into the table of insert_stmt: a single COPY ... FROM STDIN on
+    PostgreSQL, one executemany of insert_stmt elsewhere.
+    With key_column (unique within rows) the new ids are returned in row order.
+    """
+    if db.engine.dialect.name != 'postgresql':
+        result = db.session.execute(insert_stmt, rows)
+        return result.scalars().all() if key_column else None
+    
+    table = insert_stmt.table
+    # COPY skips the Python-side column defaults insert() applies (lead_score = 0,
+    # timestamps...), so rows get them filled in; callables run once per load
+    defaults = {
+        column.key: column.default.arg(None) if column.default.is_callable else column.default.arg
+        for column in table.c
+        if column.default is not None and (column.default.is_scalar or column.default.is_callable)
+    }
+    rows = [{**defaults, **row} for row in rows]
+    columns = list(rows[0])
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write('\t'.join(_copy_text(row.get(column)) for column in columns))
+        buffer.write('\n')
+    buffer.seek(0)
+    
+    preparer = db.engine.dialect.identifier_preparer
+    column_list = ', '.join(preparer.quote(column) for column in columns)
+    cursor = db.session.connection().connection.cursor()
+    try:
+        cursor.copy_expert(f'COPY {preparer.format_table(table)} ({column_list}) FROM STDIN', buffer)
+    finally:
+        cursor.close()
+    
+    if not key_column:
+        return None
+    # COPY can't return generated keys; look them up by the natural key instead
+    key = table.c[key_column]
+    ids_by_key = dict(db.session.execute(
+        select(key, table.c.id).where(key.in_([row[key_column] for row in rows]))
+    ).all())
+    return [ids_by_key[row[key_column]] for row in rows]
 
 # Database initialization endpoint
-@app.route('/api/init-database', methods=['POST', 'GET'])
+@core_bp.route('/api/init-database', methods=['POST', 'GET'])
 def init_database():
     try:
+        if db.engine.dialect.name == 'postgresql':
+            # Concurrent calls wait here, so exactly one of them seeds; the seed can
+            # simply be re-run, so don't wait for the WAL flush on commit
+            db.session.execute(text('SELECT pg_advisory_xact_lock(:key)'), {'key': _SEED_LOCK_KEY})
+            db.session.execute(text('SET LOCAL synchronous_commit = OFF'))
+        
         # Check if data already exists
         existing_companies = Company.query.count()
         existing_contacts = Contact.query.count()
@@ -77,6 +268,11 @@ def init_database():
                 'contacts': existing_contacts
             }
         
+        # One timestamp for the whole seed instead of a datetime.utcnow() default per row,
+        # naive UTC like the columns and those defaults
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        timestamps = {'created_at': now, 'updated_at': now}
+        
         # Create sample companies
         companies_data = [
             {
@@ -141,13 +337,13 @@ def init_database():
             }
         ]
         
-        created_companies = []
-        for comp_data in companies_data:
-            company = Company(**comp_data)
-            db.session.add(company)
-            created_companies.append(company)
-        
-        db.session.flush()  # Get company IDs
+        # Plain rows bypass the ORM's identity map and unit-of-work bookkeeping:
+        # one COPY (PostgreSQL) or executemany INSERT ... RETURNING per table
+        company_ids = _bulk_load(
+            _INSERT_COMPANIES,
+            [{**company_data, **timestamps} for company_data in companies_data],
+            key_column='domain'
+        )
         
         # Create sample contacts
         contacts_data = [
@@ -159,7 +355,7 @@ def init_database():
                 'job_title': 'CEO',
                 'department': 'Executive',
                 'seniority_level': 'Executive',
-                'company_id': created_companies[0].id
+                'company_id': company_ids[0]
             },
             {
                 'first_name': 'Sarah',
@@ -169,7 +365,7 @@ def init_database():
                 'job_title': 'VP of Sales',
                 'department': 'Sales',
                 'seniority_level': 'VP',
-                'company_id': created_companies[0].id
+                'company_id': company_ids[0]
             },
             {
                 'first_name': 'Mike',
@@ -179,7 +375,7 @@ def init_database():
                 'job_title': 'Owner',
                 'department': 'Executive',
                 'seniority_level': 'Executive',
-                'company_id': created_companies[1].id
+                'company_id': company_ids[1]
             },
             {
                 'first_name': 'Lisa',
@@ -189,7 +385,7 @@ def init_database():
                 'job_title': 'Director of Operations',
                 'department': 'Operations',
                 'seniority_level': 'Director',
-                'company_id': created_companies[2].id
+                'company_id': company_ids[2]
             },
             {
                 'first_name': 'David',
@@ -199,7 +395,7 @@ def init_database():
                 'job_title': 'CTO',
                 'department': 'Technology',
                 'seniority_level': 'Executive',
-                'company_id': created_companies[3].id
+                'company_id': company_ids[3]
             },
             {
                 'first_name': 'Maria',
@@ -209,41 +405,43 @@ def init_database():
                 'job_title': 'Service Manager',
                 'department': 'Operations',
                 'seniority_level': 'Manager',
-                'company_id': created_companies[4].id
+                'company_id': company_ids[4]
             }
         ]
         
-        created_contacts = []
-        for contact_data in contacts_data:
-            contact = Contact(**contact_data)
-            created_contacts.append(contact)
-            db.session.add(contact)
+        contact_ids = _bulk_load(
+            _INSERT_CONTACTS,
+            [{**contact_data, **timestamps} for contact_data in contacts_data],
+            key_column='email'
+        )
         
         # Create a sample lead list
-        lead_list = LeadList(
-            name='HVAC Prospects',
-            description='Potential HVAC companies for outreach',
-            created_by=1  # Assuming user ID 1 exists
-        )
-        db.session.add(lead_list)
-        db.session.flush()
+        lead_list_id = db.session.execute(
+            _INSERT_LEAD_LIST,
+            {
+                'name': 'HVAC Prospects',
+                'description': 'Potential HVAC companies for outreach',
+                'created_by': 1,  # Assuming user ID 1 exists
+                **timestamps
+            }
+        ).scalar_one()
         
         # Add HVAC contacts to the lead list
-        for contact in created_contacts:
-            if 'hvac' in contact.email.lower():
-                lead_list_contact = LeadListContact(
-                    list_id=lead_list.id,
-                    contact_id=contact.id
-                )
-                db.session.add(lead_list_contact)
+        list_contacts = [
+            {'list_id': lead_list_id, 'contact_id': contact_id, 'added_at': now}
+            for contact_data, contact_id in zip(contacts_data, contact_ids)
+            if 'hvac' in contact_data['email'].lower()
+        ]
+        if list_contacts:
+            _bulk_load(_INSERT_LIST_CONTACTS, list_contacts)
         
         db.session.commit()
         
         return {
             'status': 'success',
             'message': 'Database initialized successfully',
-            'companies_created': len(created_companies),
-            'contacts_created': len(created_contacts),
+            'companies_created': len(company_ids),
+            'contacts_created': len(contact_ids),
             'lead_lists_created': 1
         }
         
@@ -254,40 +452,65 @@ def init_database():
             'message': f'Failed to initialize database: {str(e)}'
         }, 500
 
+def _load_index(static_folder):
+    """Return the cached (bytes, etag, mtime) of index.html, or None if no frontend is built"""
+    path = os.path.join(static_folder, 'index.html')
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return None
+    
+    cached = _index_cache.get(path)
+    if cached is None or cached[2] != mtime:
+        with open(path, 'rb') as f:
+            data = f.read()
+        cached = (data, hashlib.sha1(data).hexdigest(), mtime)
+        _index_cache[path] = cached
+    return cached
+
+def _send_index():
+    """Serve index.html from memory, answering 304 when the client's copy is current"""
+    index = _load_index(current_app.static_folder)
+    if index is None:
+        return None
+    data, etag, mtime = index
+    return send_file(
+        io.BytesIO(data),
+        mimetype='text/html',
+        etag=etag,
+        last_modified=mtime,
+        conditional=True
+    )
+
 # Serve React frontend (if built files are present)
-@app.route('/')
+@core_bp.route('/')
 def serve_frontend():
-    try:
-        return send_from_directory(app.static_folder, 'index.html')
-    except:
-        return {
-            'message': 'LeadDB Backend API',
-            'status': 'running',
-            'frontend': 'not_deployed',
-            'api_docs': '/api'
-        }
+    response = _send_index()
+    if response is None:
+        return Response(_NOT_DEPLOYED_JSON, mimetype='application/json')
+    return response
 
-@app.route('/<path:path>')
-def serve_static_files(path):
-    try:
-        return send_from_directory(app.static_folder, path)
-    except:
-        # If file not found, serve index.html for React Router
-        try:
-            return send_from_directory(app.static_folder, 'index.html')
-        except:
-            return {'error': 'File not found'}, 404
+@lru_cache(maxsize=1024)
+def _is_static_file(static_folder, path):
+    """Whether path names a file inside static_folder (rejects paths escaping it)"""
+    full_path = safe_join(static_folder, path)
+    return full_path is not None and os.path.isfile(full_path)
 
-# Create database tables
-with app.app_context():
-    try:
-        db.create_all()
-        print("✅ Database tables created successfully")
-    except Exception as e:
-        print(f"❌ Error creating database tables: {e}")
+# Existing files are normally answered by WhiteNoise; anything reaching this view
+# is almost always a client-side route
+@core_bp.route('/<path:path>')
+def serve_static_files(path):
+    if _is_static_file(current_app.static_folder, path):
+        return send_from_directory(current_app.static_folder, path)
+    
+    # Not a file: serve index.html for React Router
+    response = _send_index()
+    if response is None:
+        return Response(_NOT_FOUND_JSON, status=404, mimetype='application/json')
+    return response
 
 if __name__ == '__main__':
+    app = create_app()
     port = int(os.environ.get('PORT', 5000))
     debug = os.environ.get('FLASK_ENV') == 'development'
     app.run(host='0.0.0.0', port=port, debug=debug)
-
@@ -1,6 +1,36 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+from operator import itemgetter
+from sqlalchemy import Text, func, literal, select
+from sqlalchemy.dialects.postgresql import ARRAY
 from src.models.user import db
+from src.models.contact import Contact
+from src.search import search_document, trigram_index
+
+# Column headers of the CSV/Excel export, in to_export_row() order
+EXPORT_COLUMNS = (
+    'Company Name', 'Website', 'Industry', 'Company Size', 'Country',
+    'State', 'City', 'Founded Year', 'Funding Status', 'LinkedIn URL',
+    'Phone', 'Description'
+)
+
+# Attributes serialized by Company.summary_dict(); to_dict() adds DETAIL_FIELDS
+_SUMMARY_FIELDS = (
+    'id', 'name', 'domain', 'website', 'industry', 'company_size',
+    'location_country', 'location_state', 'location_city', 'founded_year',
+    'funding_status', 'funding_amount', 'linkedin_url', 'phone',
+    'created_at', 'updated_at', 'contact_count'
+)
+# Large TEXT columns, deferred in the 'details' group and left out of list pages
+DETAIL_FIELDS = ('technology_stack', 'description')
+_DICT_FIELDS = _SUMMARY_FIELDS + DETAIL_FIELDS
+_summary_values = itemgetter(*_SUMMARY_FIELDS)
+_dict_values = itemgetter(*_DICT_FIELDS)
+
+def _finish_dict(data):
+    data['funding_amount'] = float(data['funding_amount']) if data['funding_amount'] else None
+    data['contact_count'] = data['contact_count'] or 0
+    return data
 
 class Company(db.Model):
     __tablename__ = 'companies'
@@ -16,57 +46,92 @@ class Company(db.Model):
     location_city = db.Column(db.String(100))
     founded_year = db.Column(db.Integer)
     funding_status = db.Column(db.String(100))
-    funding_amount = db.Column(db.Numeric(15, 2))
-    technology_stack = db.Column(db.Text)
-    description = db.Column(db.Text)
+    # Still NUMERIC in the database, but read back as float rather than Decimal
+    funding_amount = db.Column(db.Numeric(15, 2, asdecimal=False))
+    # Not loaded unless asked for: undefer_group('details') where they're needed
+    technology_stack = db.deferred(db.Column(db.Text), group='details')
+    description = db.deferred(db.Column(db.Text), group='details')
     linkedin_url = db.Column(db.String(255))
     phone = db.Column(db.String(50))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Indexes for the columns the list and search endpoints filter on
+    __table_args__ = (
+        db.Index('ix_companies_industry_size_country', 'industry', 'company_size', 'location_country'),
+        db.Index('ix_companies_founded_year', 'founded_year'),
+        db.Index('ix_companies_funding_status', 'funding_status'),
+    )
+    
     # Relationship with contacts
-    contacts = db.relationship('Contact', backref='company', lazy=True, cascade='all, delete-orphan')
+    contacts = db.relationship('Contact', back_populates='company', lazy=True, cascade='all, delete-orphan')
+    
+    # Number of contacts, counted in SQL alongside the company row instead of
+    # loading every contact; undefer(Company.contact_count) on list queries
+    contact_count = db.column_property(
+        select(func.count(Contact.id)).where(Contact.company_id == id).correlate_except(Contact).scalar_subquery(),
+        deferred=True
+    )
 
     def __repr__(self):
         return f'<Company {self.name}>'
 
+    def _fields_dict(self, fields, values_of):
+        # Loaded values straight from the instance dict, all pulled by one itemgetter
+        # call; getattr() only when some attribute isn't loaded yet. Datetimes are
+        # left to the (orjson) JSON provider to render
+        values = self.__dict__
+        try:
+            data = dict(zip(fields, values_of(values)))
+        except KeyError:
+            data = {key: values[key] if key in values else getattr(self, key) for key in fields}
+        return _finish_dict(data)
+
+    def summary_dict(self):
+        """List-page format: to_dict() without the large DETAIL_FIELDS columns"""
+        return self._fields_dict(_SUMMARY_FIELDS, _summary_values)
+
     def to_dict(self):
-        return {
-            'id': self.id,
-            'name': self.name,
-            'domain': self.domain,
-            'website': self.website,
-            'industry': self.industry,
-            'company_size': self.company_size,
-            'location_country': self.location_country,
-            'location_state': self.location_state,
-            'location_city': self.location_city,
-            'founded_year': self.founded_year,
-            'funding_status': self.funding_status,
-            'funding_amount': float(self.funding_amount) if self.funding_amount else None,
-            'technology_stack': self.technology_stack,
-            'description': self.description,
-            'linkedin_url': self.linkedin_url,
-            'phone': self.phone,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            'contact_count': len(self.contacts) if self.contacts else 0
-        }
+        return self._fields_dict(_DICT_FIELDS, _dict_values)
+
+    @staticmethod
+    def row_dict(values):
+        """to_dict() of a company from its DICT_COLUMNS values, without an ORM instance"""
+        return _finish_dict(dict(zip(_DICT_FIELDS, values)))
+
+    def to_export_row(self):
+        """Export values in EXPORT_COLUMNS order, for writing straight to csv.writer"""
+        return (
+            self.name, self.website, self.industry, self.company_size,
+            self.location_country, self.location_state, self.location_city,
+            self.founded_year, self.funding_status, self.linkedin_url,
+            self.phone, self.description
+        )
 
     def to_export_dict(self):
         """Simplified format for CSV/Excel export"""
-        return {
-            'Company Name': self.name,
-            'Website': self.website,
-            'Industry': self.industry,
-            'Company Size': self.company_size,
-            'Country': self.location_country,
-            'State': self.location_state,
-            'City': self.location_city,
-            'Founded Year': self.founded_year,
-            'Funding Status': self.funding_status,
-            'LinkedIn URL': self.linkedin_url,
-            'Phone': self.phone,
-            'Description': self.description
-        }
+        return dict(zip(EXPORT_COLUMNS, self.to_export_row()))
+
+# Columns to select for Company.row_dict(), in to_dict() order
+DICT_COLUMNS = tuple(getattr(Company, field) for field in _DICT_FIELDS)
+
+# Full-text document for the company search on PostgreSQL, GIN-indexed so
+# `SEARCH_DOCUMENT @@ tsquery` is an index lookup
+SEARCH_DOCUMENT = search_document(Company.name, Company.domain, Company.description)
+db.Index('ix_companies_search', SEARCH_DOCUMENT, postgresql_using='gin').ddl_if(dialect='postgresql')
+
+# Company names alone, for the contact search's company-name match
+NAME_DOCUMENT = search_document(Company.name)
+db.Index('ix_companies_name_search', NAME_DOCUMENT, postgresql_using='gin').ddl_if(dialect='postgresql')
+
+# technology_stack as a lowercased array of its comma-separated entries, GIN-indexed
+# on PostgreSQL so the technology filter is one `&&` (overlap) index probe; like
+# SEARCH_DOCUMENT, queries must use this exact expression to hit the index
+TECHNOLOGY_ARRAY = func.regexp_split_to_array(
+    func.lower(Company.technology_stack), literal(r'\s*,\s*'), type_=ARRAY(Text)
+)
+db.Index('ix_companies_technologies', TECHNOLOGY_ARRAY, postgresql_using='gin').ddl_if(dialect='postgresql')
 
+# Trigram indexes for the substring (ILIKE '%term%') company name and industry filters
+trigram_index('ix_companies_name_trgm', Company.name)
+trigram_index('ix_companies_industry_trgm', Company.industry)
@@ -1,12 +1,103 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+from operator import itemgetter
+from functools import lru_cache
+import re
+from sqlalchemy import func
 from src.models.user import db
+from src.search import search_document, trigram_index
+
+# Lead score keyword buckets as (keywords, points), checked in order; the first
+# bucket with a keyword contained in the (lowercased) field scores. Buckets are
+# listed in descending points, so that is also the best-scoring keyword found
+TITLE_SCORES = (
+    (('ceo', 'founder', 'president'), 30),
+    (('cto', 'cfo', 'cmo'), 25),
+    (('director', 'vp', 'vice president'), 20),
+    (('manager', 'head'), 15),
+    (('lead', 'senior'), 10),
+)
+DEPARTMENT_SCORES = (
+    (('executive', 'c-suite'), 20),
+    (('marketing', 'sales'), 15),
+    (('engineering', 'product'), 10),
+)
+SENIORITY_SCORES = (
+    (('executive', 'c-level'), 25),
+    (('senior', 'director'), 15),
+    (('manager',), 10),
+)
+# Points for each piece of contact info present
+CONTACT_INFO_SCORES = (('email', 10), ('phone', 5), ('linkedin_url', 5))
+
+# Each bucket's keywords compiled into one alternation, for Contact.bulk_score()
+_SCORE_PATTERNS = tuple(
+    (field, tuple((re.compile('|'.join(map(re.escape, keywords))), points) for keywords, points in buckets))
+    for field, buckets in (
+        ('job_title', TITLE_SCORES),
+        ('department', DEPARTMENT_SCORES),
+        ('seniority_level', SENIORITY_SCORES),
+    )
+)
+
+# Column headers of the CSV/Excel export (Zoho CRM compatible), in to_export_row() order
+EXPORT_COLUMNS = (
+    'First Name', 'Last Name', 'Email', 'Phone', 'Job Title',
+    'Department', 'Seniority Level', 'Company Name', 'Company Website',
+    'Company Industry', 'Company Size', 'Country', 'State', 'City',
+    'LinkedIn URL', 'Twitter URL', 'Lead Score'
+)
+
+# Attributes serialized by Contact.to_dict()
+_DICT_FIELDS = (
+    'id', 'company_id', 'first_name', 'last_name', 'email', 'phone', 'job_title',
+    'department', 'seniority_level', 'linkedin_url', 'twitter_url',
+    'location_country', 'location_state', 'location_city', 'lead_score',
+    'last_activity_date', 'created_at', 'updated_at'
+)
+_dict_values = itemgetter(*_DICT_FIELDS)
+
+def _keyword_matcher(buckets):
+    """
+    Compile score buckets into (pattern, points by keyword). The pattern finds
+    every keyword occurrence, overlapping ones included, in a single scan;
+    at each position the highest-scoring keyword is tried first
+    """
+    points = {keyword: bucket_points for keywords, bucket_points in buckets for keyword in keywords}
+    alternation = '|'.join(map(re.escape, sorted(points, key=points.get, reverse=True)))
+    return re.compile(f'(?=({alternation}))'), points
+
+_TITLE_MATCHER = _keyword_matcher(TITLE_SCORES)
+_DEPARTMENT_MATCHER = _keyword_matcher(DEPARTMENT_SCORES)
+_SENIORITY_MATCHER = _keyword_matcher(SENIORITY_SCORES)
+
+def _bucket_score(value, matcher):
+    """Points of the best-scoring keyword contained in value (buckets score in descending order)"""
+    if not value:
+        return 0
+    pattern, points = matcher
+    return max((points[keyword] for keyword in pattern.findall(value.lower())), default=0)
+
+# Job titles, departments and seniority levels repeat heavily across contacts, so
+# scores are memoized on the scored inputs (bounded to keep memory flat)
+@lru_cache(maxsize=4096)
+def _score(job_title, department, seniority_level, has_email, has_phone, has_linkedin):
+    """Lead score for one combination of scored attributes, clamped to 0-100"""
+    score = (
+        _bucket_score(job_title, _TITLE_MATCHER)
+        + _bucket_score(department, _DEPARTMENT_MATCHER)
+        + _bucket_score(seniority_level, _SENIORITY_MATCHER)
+    )
+    for present, (_, points) in zip((has_email, has_phone, has_linkedin), CONTACT_INFO_SCORES):
+        if present:
+            score += points
+    return min(100, max(0, score))
 
 class Contact(db.Model):
     __tablename__ = 'contacts'
     
     id = db.Column(db.Integer, primary_key=True)
-    company_id = db.Column(db.Integer, db.ForeignKey('companies.id'), nullable=True)
+    company_id = db.Column(db.Integer, db.ForeignKey('companies.id'), nullable=True, index=True)
     first_name = db.Column(db.String(100), nullable=False)
     last_name = db.Column(db.String(100), nullable=False)
     email = db.Column(db.String(255))
@@ -23,6 +114,20 @@ class Contact(db.Model):
     last_activity_date = db.Column(db.DateTime)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Index for the advanced search's most common filter combination, and a
+    # partial index on job titles that serves the top titles of /contacts/stats
+    # from an index-only scan
+    __table_args__ = (
+        db.Index('ix_contacts_seniority_department_country', 'seniority_level', 'department', 'location_country'),
+        db.Index(
+            'ix_contacts_job_title', job_title,
+            postgresql_where=job_title.isnot(None), sqlite_where=job_title.isnot(None)
+        ),
+    )
+    
+    # Parent company, fetched for a whole page of contacts with one IN query
+    company = db.relationship('Company', back_populates='contacts', lazy='selectin')
 
     def __repr__(self):
         return f'<Contact {self.first_name} {self.last_name}>'
@@ -33,101 +138,119 @@ class Contact(db.Model):
 
     def calculate_lead_score(self):
         """Calculate lead score based on contact attributes"""
-        score = 0
+        return _score(
+            self.job_title, self.department, self.seniority_level,
+            bool(self.email), bool(self.phone), bool(self.linkedin_url)
+        )
+
+    @classmethod
+    def bulk_score(cls, rows):
+        """
+        Lead scores for many contacts (dicts of contact fields) at once, matching
+        calculate_lead_score() but vectorized over columns instead of per object
+        """
+        if not rows:
+            return []
         
-        # Job title scoring
-        if self.job_title:
-            title = self.job_title.lower()
-            if 'ceo' in title or 'founder' in title or 'president' in title:
-                score += 30
-            elif 'cto' in title or 'cfo' in title or 'cmo' in title:
-                score += 25
-            elif 'director' in title or 'vp' in title or 'vice president' in title:
-                score += 20
-            elif 'manager' in title or 'head' in title:
-                score += 15
-            elif 'lead' in title or 'senior' in title:
-                score += 10
+        # Only needed for bulk scoring, so keep them out of application startup
+        import numpy as np
+        import pandas as pd
         
-        # Department scoring
-        if self.department:
-            dept = self.department.lower()
-            if 'executive' in dept or 'c-suite' in dept:
-                score += 20
-            elif 'marketing' in dept or 'sales' in dept:
-                score += 15
-            elif 'engineering' in dept or 'product' in dept:
-                score += 10
+        frame = pd.DataFrame.from_records(
+            rows, columns=[field for field, _ in _SCORE_PATTERNS] + [field for field, _ in CONTACT_INFO_SCORES]
+        )
+        score = np.zeros(len(frame), dtype=int)
         
-        # Seniority level scoring
-        if self.seniority_level:
-            seniority = self.seniority_level.lower()
-            if 'executive' in seniority or 'c-level' in seniority:
-                score += 25
-            elif 'senior' in seniority or 'director' in seniority:
-                score += 15
-            elif 'manager' in seniority:
-                score += 10
+        for field, patterns in _SCORE_PATTERNS:
+            values = frame[field].fillna('').astype(str).str.lower()
+            # np.select takes the first matching condition, like the elif ladder
+            score += np.select(
+                [values.str.contains(pattern).to_numpy() for pattern, _ in patterns],
+                [points for _, points in patterns],
+                default=0
+            )
         
-        # Contact info completeness
-        if self.email:
-            score += 10
-        if self.phone:
-            score += 5
-        if self.linkedin_url:
-            score += 5
+        for field, points in CONTACT_INFO_SCORES:
+            score += np.where(frame[field].fillna('').astype(bool).to_numpy(), points, 0)
         
-        # Ensure score is between 0 and 100
-        return min(100, max(0, score))
+        return np.clip(score, 0, 100).tolist()
 
     def to_dict(self):
-        return {
-            'id': self.id,
-            'company_id': self.company_id,
-            'first_name': self.first_name,
-            'last_name': self.last_name,
-            'full_name': self.full_name,
-            'email': self.email,
-            'phone': self.phone,
-            'job_title': self.job_title,
-            'department': self.department,
-            'seniority_level': self.seniority_level,
-            'linkedin_url': self.linkedin_url,
-            'twitter_url': self.twitter_url,
-            'location_country': self.location_country,
-            'location_state': self.location_state,
-            'location_city': self.location_city,
-            'lead_score': self.lead_score,
-            'last_activity_date': self.last_activity_date.isoformat() if self.last_activity_date else None,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            'company': self.company.to_dict() if self.company else None
-        }
+        # Loaded values straight from the instance dict, all pulled by one itemgetter
+        # call; getattr() only when some attribute isn't loaded yet. Datetimes are
+        # left to the (orjson) JSON provider to render
+        values = self.__dict__
+        try:
+            data = dict(zip(_DICT_FIELDS, _dict_values(values)))
+        except KeyError:
+            data = {key: values[key] if key in values else getattr(self, key) for key in _DICT_FIELDS}
+        data['full_name'] = f"{data['first_name']} {data['last_name']}"
+        company = values['company'] if 'company' in values else self.company
+        data['company'] = company.to_dict() if company else None
+        return data
+
+    @staticmethod
+    def row_dict(values, company):
+        """
+        to_dict() of a contact from its DICT_COLUMNS values and its company's
+        dict (or None), without an ORM instance
+        """
+        data = dict(zip(_DICT_FIELDS, values))
+        data['full_name'] = f"{data['first_name']} {data['last_name']}"
+        data['company'] = company
+        return data
+
+    def to_export_row(self):
+        """Export values in EXPORT_COLUMNS order, for writing straight to csv.writer"""
+        company = self.company
+        if company:
+            company_fields = (company.name, company.website, company.industry, company.company_size)
+        else:
+            company_fields = ('', '', '', '')
+        
+        return (
+            self.first_name, self.last_name, self.email, self.phone, self.job_title,
+            self.department, self.seniority_level, *company_fields,
+            self.location_country, self.location_state, self.location_city,
+            self.linkedin_url, self.twitter_url, self.lead_score
+        )
 
     def to_export_dict(self):
         """Simplified format for CSV/Excel export compatible with Zoho CRM"""
-        company_name = self.company.name if self.company else ''
-        company_website = self.company.website if self.company else ''
-        company_industry = self.company.industry if self.company else ''
-        company_size = self.company.company_size if self.company else ''
-        
-        return {
-            'First Name': self.first_name,
-            'Last Name': self.last_name,
-            'Email': self.email,
-            'Phone': self.phone,
-            'Job Title': self.job_title,
-            'Department': self.department,
-            'Seniority Level': self.seniority_level,
-            'Company Name': company_name,
-            'Company Website': company_website,
-            'Company Industry': company_industry,
-            'Company Size': company_size,
-            'Country': self.location_country,
-            'State': self.location_state,
-            'City': self.location_city,
-            'LinkedIn URL': self.linkedin_url,
-            'Twitter URL': self.twitter_url,
-            'Lead Score': self.lead_score
-        }
+        return dict(zip(EXPORT_COLUMNS, self.to_export_row()))
+
+# Columns to select for Contact.row_dict(), in to_dict() order
+DICT_COLUMNS = tuple(getattr(Contact, field) for field in _DICT_FIELDS)
+
+# Contact list order, best leads first: lead score (NULL as 0) then id, both
+# descending, indexed so keyset pages are index range scans
+SORT_SCORE = func.coalesce(Contact.lead_score, 0)
+db.Index('ix_contacts_score_id', SORT_SCORE.desc(), Contact.id.desc())
+
+# Full-text document for the contact search on PostgreSQL, GIN-indexed. Email
+# separators become spaces so each part of an address is a word of its own
+SEARCH_DOCUMENT = search_document(
+    Contact.first_name, Contact.last_name, func.translate(Contact.email, '@.', '  '), Contact.job_title
+)
+db.Index('ix_contacts_search', SEARCH_DOCUMENT, postgresql_using='gin').ddl_if(dialect='postgresql')
+
+# Lowercased country and department for the case-insensitive prefix filters.
+# text_pattern_ops indexes let PostgreSQL serve LIKE 'prefix%' on them as
+# index range scans, whatever the database collation
+LOWER_COUNTRY = func.lower(Contact.location_country)
+LOWER_DEPARTMENT = func.lower(Contact.department)
+db.Index(
+    'ix_contacts_country_lower', LOWER_COUNTRY.label('country_lower'),
+    postgresql_ops={'country_lower': 'text_pattern_ops'}
+).ddl_if(dialect='postgresql')
+db.Index(
+    'ix_contacts_department_lower', LOWER_DEPARTMENT.label('department_lower'),
+    postgresql_ops={'department_lower': 'text_pattern_ops'}
+).ddl_if(dialect='postgresql')
 
+# Trigram indexes for the substring (ILIKE '%term%') contact filters
+trigram_index('ix_contacts_job_title_trgm', Contact.job_title)
+trigram_index('ix_contacts_department_trgm', Contact.department)
+trigram_index('ix_contacts_location_city_trgm', Contact.location_city)
+trigram_index('ix_contacts_location_state_trgm', Contact.location_state)
+trigram_index('ix_contacts_location_country_trgm', Contact.location_country)
@@ -1,5 +1,6 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+from sqlalchemy import func, select
 from src.models.user import db
 
 class LeadList(db.Model):
@@ -19,14 +20,15 @@ class LeadList(db.Model):
         return f'<LeadList {self.name}>'
 
     def to_dict(self):
+        # Datetimes are left to the (orjson) JSON provider to render
         return {
             'id': self.id,
             'name': self.name,
             'description': self.description,
             'created_by': self.created_by,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            'contact_count': self.contacts.count()
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
+            'contact_count': self.contact_count or 0
         }
 
 class LeadListContact(db.Model):
@@ -43,6 +45,14 @@ class LeadListContact(db.Model):
     def __repr__(self):
         return f'<LeadListContact list_id={self.list_id} contact_id={self.contact_id}>'
 
+# Number of contacts on the list as a correlated COUNT, so a page of lists is one
+# query rather than one COUNT per list; undefer(LeadList.contact_count) on list queries
+LeadList.contact_count = db.column_property(
+    select(func.count(LeadListContact.id)).where(LeadListContact.list_id == LeadList.id)
+    .correlate_except(LeadListContact).scalar_subquery(),
+    deferred=True
+)
+
 class SavedSearch(db.Model):
     __tablename__ = 'saved_searches'
     
@@ -56,11 +66,12 @@ class SavedSearch(db.Model):
         return f'<SavedSearch {self.name}>'
 
     def to_dict(self):
+        # Datetimes are left to the (orjson) JSON provider to render
         return {
             'id': self.id,
             'name': self.name,
             'filters': self.filters,
             'created_by': self.created_by,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'created_at': self.created_at
         }
 
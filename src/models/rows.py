@@ -0,0 +1,17 @@
+from src.models.contact import Contact, DICT_COLUMNS as CONTACT_COLUMNS
+from src.models.company import Company, DICT_COLUMNS as COMPANY_COLUMNS
+
+# Contact pages select plain rows, contact then company columns, from the
+# contacts/companies join the filters already use: no ORM objects are built and
+# the companies come with the contacts instead of from a second query. Kept out
+# of contact.py because company.py imports that module (for contact_count)
+ROW_COLUMNS = CONTACT_COLUMNS + COMPANY_COLUMNS
+_COMPANY_OFFSET = len(CONTACT_COLUMNS)
+
+def contact_row_dict(row):
+    """Contact.to_dict() output for one ROW_COLUMNS row"""
+    company = row[_COMPANY_OFFSET:]
+    # Company id is NULL when the outer join found no company
+    return Contact.row_dict(
+        row[:_COMPANY_OFFSET], Company.row_dict(company) if company[0] is not None else None
+    )
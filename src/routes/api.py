@@ -1,41 +1,50 @@
-from flask import Blueprint
+from flask import Blueprint, Response
+from sqlalchemy import func, select
+from src.cache import cache, is_success
+from src.json_provider import constant_json
+from src.models.user import db
 from src.models.company import Company
 from src.models.contact import Contact
 from src.models.lead_list import LeadList
 
 api_bp = Blueprint('api', __name__)
 
+# The endpoint index never changes, so serialize it once
+_API_INFO_JSON = constant_json({
+    'service': 'LeadDB API',
+    'version': '1.0.0',
+    'endpoints': {
+        'stats': '/api/stats',
+        'companies': '/api/companies',
+        'contacts': '/api/contacts',
+        'lead_lists': '/api/lists',
+        'lead_generation': '/api/leads',
+        'export': '/api/export',
+        'health': '/health',
+        'init_db': '/api/init-database'
+    }
+})
+
+# All three /stats counts in one SELECT of scalar subqueries, one round trip
+_STATS_QUERY = select(
+    select(func.count()).select_from(Company).scalar_subquery().label('companies'),
+    select(func.count()).select_from(Contact).scalar_subquery().label('contacts'),
+    select(func.count()).select_from(LeadList).scalar_subquery().label('campaigns')
+)
+
 @api_bp.route('/')
 def api_info():
-    return {
-        'service': 'LeadDB API',
-        'version': '1.0.0',
-        'endpoints': {
-            'stats': '/api/stats',
-            'companies': '/api/companies',
-            'contacts': '/api/contacts',
-            'lead_lists': '/api/lists',
-            'lead_generation': '/api/leads',
-            'export': '/api/export',
-            'health': '/health',
-            'init_db': '/api/init-database'
-        }
-    }
+    return Response(_API_INFO_JSON, mimetype='application/json')
 
 @api_bp.route('/stats')
+@cache.cached(timeout=30, key_prefix='stats', response_filter=is_success)
 def get_stats():
     try:
-        company_count = Company.query.count()
-        contact_count = Contact.query.count()
-        lead_list_count = LeadList.query.count()
+        counts = db.session.execute(_STATS_QUERY).one()
         
         return {
             'status': 'success',
-            'stats': {
-                'companies': company_count,
-                'contacts': contact_count,
-                'campaigns': lead_list_count
-            }
+            'stats': dict(counts._mapping)
         }
     except Exception as e:
         return {
@@ -1,33 +1,106 @@
-from flask import Blueprint, jsonify, request
-from sqlalchemy import or_, and_
+from flask import Blueprint, abort, jsonify, request
+from sqlalchemy import Text, bindparam, func, insert, or_, and_, text, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import undefer, undefer_group
+from src.cache import cache
 from src.models.user import db
-from src.models.company import Company
+from src.models.company import Company, SEARCH_DOCUMENT, TECHNOLOGY_ARRAY
+from src.search import prefix_tsquery
 
 companies_bp = Blueprint('companies', __name__)
 
+# Rows inserted and committed per chunk by POST /companies/bulk
+BULK_CHUNK_SIZE = 5000
+
+# Fields a PUT /companies/<id> may change
+UPDATABLE_FIELDS = frozenset((
+    'name', 'domain', 'website', 'industry', 'company_size',
+    'location_country', 'location_state', 'location_city',
+    'founded_year', 'funding_status', 'funding_amount',
+    'technology_stack', 'description', 'linkedin_url', 'phone'
+))
+
+# Loader options of the list and detail queries, built once at import instead of
+# on every request
+_LIST_OPTIONS = (undefer(Company.contact_count),)
+_DETAIL_OPTIONS = (undefer(Company.contact_count), undefer_group('details'))
+
+def _seek_page(query, cursor, per_page):
+    """
+    Keyset pagination: the page of companies after id `cursor`, ordered by id.
+    One extra row is fetched to tell whether there is a next page, so no COUNT runs.
+    """
+    if cursor:
+        query = query.filter(Company.id > cursor)
+    rows = query.order_by(Company.id).limit(per_page + 1).all()
+    items = rows[:per_page]
+    has_next = len(rows) > per_page
+    return items, has_next, (items[-1].id if has_next else None)
+
+def _search_condition(search):
+    """
+    Free-text company search: an indexed full-text match of every search word
+    (as a prefix) on PostgreSQL, substring ILIKE on name/domain/description elsewhere
+    """
+    tsquery = prefix_tsquery(search)
+    if tsquery is not None and db.engine.dialect.name == 'postgresql':
+        return SEARCH_DOCUMENT.op('@@')(tsquery)
+    return or_(
+        Company.name.ilike(f'%{search}%'),
+        Company.domain.ilike(f'%{search}%'),
+        Company.description.ilike(f'%{search}%')
+    )
+
+def _technology_condition(technologies):
+    """
+    Companies using any of the given technologies: an indexed array overlap against
+    the comma-separated technology_stack entries (case-insensitive) on PostgreSQL,
+    one ILIKE per technology elsewhere
+    """
+    if db.engine.dialect.name == 'postgresql':
+        return TECHNOLOGY_ARRAY.op('&&')(
+            bindparam('technologies', [tech.lower() for tech in technologies], type_=ARRAY(Text))
+        )
+    return or_(*(Company.technology_stack.ilike(f'%{tech}%') for tech in technologies))
+
+def _total_estimate():
+    """Approximate number of companies, from the planner statistics on PostgreSQL"""
+    if db.engine.dialect.name == 'postgresql':
+        estimate = db.session.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE relname = 'companies'")
+        ).scalar()
+        # -1 until the table has been vacuumed/analyzed once
+        if estimate is not None and estimate >= 0:
+            return estimate
+    return db.session.query(func.count(Company.id)).scalar()
+
 @companies_bp.route('/companies', methods=['GET'])
+# First pages are what the UI requests over and over; deeper pages aren't cached
+@cache.cached(timeout=10, query_string=True, unless=lambda: 'cursor' in request.args)
 def get_companies():
     """Get companies with optional filtering"""
-    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor', type=int)
     per_page = request.args.get('per_page', 20, type=int)
     
     # Build query with filters
-    query = Company.query
+    query = Company.query.options(*_LIST_OPTIONS)
     
     # Search filters
     search = request.args.get('search')
     if search:
-        query = query.filter(or_(
-            Company.name.ilike(f'%{search}%'),
-            Company.domain.ilike(f'%{search}%'),
-            Company.description.ilike(f'%{search}%')
-        ))
+        query = query.filter(_search_condition(search))
     
-    # Industry filter
+    # Industry filter; the *_eq variants of industry, country and funding_status
+    # match the exact value and can use the column indexes, the plain parameters
+    # keep matching substrings
     industry = request.args.get('industry')
     if industry:
         query = query.filter(Company.industry.ilike(f'%{industry}%'))
     
+    industry_eq = request.args.get('industry_eq')
+    if industry_eq:
+        query = query.filter(Company.industry == industry_eq)
+    
     # Company size filter
     company_size = request.args.get('company_size')
     if company_size:
@@ -38,6 +111,10 @@ def get_companies():
     if country:
         query = query.filter(Company.location_country.ilike(f'%{country}%'))
     
+    country_eq = request.args.get('country_eq')
+    if country_eq:
+        query = query.filter(Company.location_country == country_eq)
+    
     state = request.args.get('state')
     if state:
         query = query.filter(Company.location_state.ilike(f'%{state}%'))
@@ -51,6 +128,10 @@ def get_companies():
     if funding_status:
         query = query.filter(Company.funding_status.ilike(f'%{funding_status}%'))
     
+    funding_status_eq = request.args.get('funding_status_eq')
+    if funding_status_eq:
+        query = query.filter(Company.funding_status == funding_status_eq)
+    
     # Founded year range
     founded_after = request.args.get('founded_after', type=int)
     if founded_after:
@@ -66,20 +147,17 @@ def get_companies():
         query = query.filter(Company.technology_stack.ilike(f'%{technology}%'))
     
     # Execute paginated query
-    companies = query.paginate(
-        page=page, 
-        per_page=per_page, 
-        error_out=False
-    )
+    companies, has_next, next_cursor = _seek_page(query, cursor, per_page)
     
     return jsonify({
-        'companies': [company.to_dict() for company in companies.items],
-        'total': companies.total,
-        'pages': companies.pages,
-        'current_page': page,
+        'companies': [company.summary_dict() for company in companies],
+        # Exact totals cost a COUNT over the whole filter, so only the unfiltered
+        # listing reports one, and only as an estimate
+        'total_estimate': _total_estimate() if query.whereclause is None else None,
         'per_page': per_page,
-        'has_next': companies.has_next,
-        'has_prev': companies.has_prev
+        'next_cursor': next_cursor,
+        'has_next': has_next,
+        'has_prev': bool(cursor)
     })
 
 @companies_bp.route('/companies', methods=['POST'])
@@ -113,25 +191,33 @@ def create_company():
 @companies_bp.route('/companies/<int:company_id>', methods=['GET'])
 def get_company(company_id):
     """Get a specific company by ID"""
-    company = Company.query.get_or_404(company_id)
+    company = Company.query.options(*_DETAIL_OPTIONS).get_or_404(company_id)
     return jsonify(company.to_dict())
 
 @companies_bp.route('/companies/<int:company_id>', methods=['PUT'])
 def update_company(company_id):
     """Update a company"""
-    company = Company.query.get_or_404(company_id)
     data = request.json
+    values = {field: value for field, value in data.items() if field in UPDATABLE_FIELDS}
+    if not values:
+        return jsonify(Company.query.options(*_DETAIL_OPTIONS).get_or_404(company_id).to_dict())
     
-    # Update fields if provided
-    for field in ['name', 'domain', 'website', 'industry', 'company_size', 
-                  'location_country', 'location_state', 'location_city', 
-                  'founded_year', 'funding_status', 'funding_amount', 
-                  'technology_stack', 'description', 'linkedin_url', 'phone']:
-        if field in data:
-            setattr(company, field, data[field])
+    # Single UPDATE ... RETURNING instead of SELECT, setattr per field and a flush;
+    # the returned row populates the Company without another query
+    company = db.session.scalars(
+        update(Company)
+        .where(Company.id == company_id)
+        .values(values)
+        .returning(Company)
+        .options(*_DETAIL_OPTIONS)
+    ).one_or_none()
+    if company is None:
+        abort(404)
     
+    # Serialize before commit() expires the object, which would mean a refresh
+    result = company.to_dict()
     db.session.commit()
-    return jsonify(company.to_dict())
+    return jsonify(result)
 
 @companies_bp.route('/companies/<int:company_id>', methods=['DELETE'])
 def delete_company(company_id):
@@ -146,10 +232,10 @@ def advanced_company_search():
     """Advanced company search with complex filters"""
     data = request.json
     filters = data.get('filters', {})
-    page = data.get('page', 1)
+    cursor = data.get('cursor')
     per_page = data.get('per_page', 20)
     
-    query = Company.query
+    query = Company.query.options(*_LIST_OPTIONS)
     
     # Apply filters from the request
     if 'industries' in filters and filters['industries']:
@@ -165,10 +251,7 @@ def advanced_company_search():
         query = query.filter(Company.funding_status.in_(filters['funding_statuses']))
     
     if 'technologies' in filters and filters['technologies']:
-        tech_conditions = []
-        for tech in filters['technologies']:
-            tech_conditions.append(Company.technology_stack.ilike(f'%{tech}%'))
-        query = query.filter(or_(*tech_conditions))
+        query = query.filter(_technology_condition(filters['technologies']))
     
     if 'founded_year_range' in filters:
         year_range = filters['founded_year_range']
@@ -178,20 +261,14 @@ def advanced_company_search():
             query = query.filter(Company.founded_year <= year_range['max'])
     
     # Execute paginated query
-    companies = query.paginate(
-        page=page, 
-        per_page=per_page, 
-        error_out=False
-    )
+    companies, has_next, next_cursor = _seek_page(query, cursor, per_page)
     
     return jsonify({
-        'companies': [company.to_dict() for company in companies.items],
-        'total': companies.total,
-        'pages': companies.pages,
-        'current_page': page,
+        'companies': [company.summary_dict() for company in companies],
         'per_page': per_page,
-        'has_next': companies.has_next,
-        'has_prev': companies.has_prev,
+        'next_cursor': next_cursor,
+        'has_next': has_next,
+        'has_prev': bool(cursor),
         'filters_applied': filters
     })
 
@@ -201,16 +278,26 @@ def bulk_create_companies():
     data = request.json
     companies_data = data.get('companies', [])
     
-    companies = []
-    for company_data in companies_data:
-        company = Company(**company_data)
-        companies.append(company)
-    
-    db.session.add_all(companies)
-    db.session.commit()
+    # Insert and commit in chunks: one multi-row INSERT ... RETURNING id per chunk
+    # (insertmanyvalues), no ORM objects held, and memory bounded by the chunk size
+    # however large the payload. Callers fetch full rows by id if they need them
+    company_ids = []
+    try:
+        for start in range(0, len(companies_data), BULK_CHUNK_SIZE):
+            chunk = companies_data[start:start + BULK_CHUNK_SIZE]
+            company_ids.extend(db.session.scalars(
+                insert(Company).returning(Company.id, sort_by_parameter_order=True),
+                chunk
+            ))
+            db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        # Earlier chunks are already committed; report how far the import got
+        return jsonify({'error': str(e), 'created': len(company_ids), 'company_ids': company_ids}), 500
     
     return jsonify({
-        'message': f'Successfully created {len(companies)} companies',
-        'companies': [company.to_dict() for company in companies]
+        'message': f'Successfully created {len(company_ids)} companies',
+        'created': len(company_ids),
+        'company_ids': company_ids
     }), 201
 
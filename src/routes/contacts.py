@@ -1,15 +1,225 @@
 from flask import Blueprint, jsonify, request
-from sqlalchemy import or_, and_, join
+import hashlib
+from datetime import datetime
+import orjson
+from sqlalchemy import any_, func, insert, or_, and_, join, select, tuple_
+from sqlalchemy.orm import joinedload, lazyload
+from src.cache import cache
 from src.models.user import db
-from src.models.contact import Contact
-from src.models.company import Company
+from src.models.contact import (
+    Contact, LOWER_COUNTRY, LOWER_DEPARTMENT, SEARCH_DOCUMENT, SORT_SCORE
+)
+from src.models.company import Company, NAME_DOCUMENT
+from src.models.rows import ROW_COLUMNS, contact_row_dict
+from src.search import prefix_tsquery
 
 contacts_bp = Blueprint('contacts', __name__)
 
+# Fields a PUT /contacts/<id> may change
+UPDATABLE_FIELDS = (
+    'company_id', 'first_name', 'last_name', 'email', 'phone',
+    'job_title', 'department', 'seniority_level', 'linkedin_url',
+    'twitter_url', 'location_country', 'location_state',
+    'location_city', 'lead_score'
+)
+
+# Fields a POST /contacts/bulk row may set; anything else in a row is ignored
+INSERTABLE_FIELDS = frozenset(UPDATABLE_FIELDS + ('last_activity_date',))
+
+# Fields every POST /contacts/bulk row must have (the NOT NULL name columns)
+REQUIRED_FIELDS = ('first_name', 'last_name')
+
+# What a POST /contacts/bulk value must be, by column Python type
+_TYPE_NAMES = {int: 'an integer', str: 'a string', datetime: 'an ISO 8601 date'}
+
+# Query args of GET /contacts that page through results rather than filter them
+PAGING_ARGS = frozenset(('cursor_score', 'cursor_id', 'per_page'))
+
+# List filters of POST /contacts/search matched by value, as (filter key, column),
+# in the order of the (seniority_level, department, location_country) index
+_VALUE_FILTERS = (
+    ('seniority_levels', Contact.seniority_level),
+    ('departments', Contact.department),
+    ('countries', Contact.location_country),
+    ('company_industries', Company.industry),
+    ('company_sizes', Company.company_size),
+)
+
+# Filters of POST /contacts/search on company columns; only these need the
+# contacts/companies join to filter and count
+_COMPANY_FILTERS = ('company_industries', 'company_sizes')
+
+# Total, with-email and with-phone contact counts for /contacts/stats in one
+# scan, as FILTERed aggregates
+_COUNTS_QUERY = select(
+    func.count(),
+    func.count().filter(and_(Contact.email.isnot(None), Contact.email != '')),
+    func.count().filter(and_(Contact.phone.isnot(None), Contact.phone != ''))
+).select_from(Contact)
+
+# Seconds a filtered contact count is kept. Writes clear it sooner in a shared
+# (Redis) cache, but only on the writing worker with the per-process SimpleCache
+COUNT_CACHE_TIMEOUT = 60
+
+# Loader options of single-contact responses: the company comes in the same
+# query, with the columns Company.to_dict() needs
+_DETAIL_OPTIONS = (joinedload(Contact.company).undefer(Company.contact_count).undefer_group('details'),)
+
+def _bulk_contact_row(contact_data):
+    """
+    The insertable fields of a POST /contacts/bulk row, coerced to their column
+    types: integers (or integral numbers and numeric strings) for company_id and
+    lead_score, ISO 8601 strings for last_activity_date, strings within the
+    column length otherwise. Raises ValueError naming the first invalid field
+    """
+    row = {}
+    for key, value in contact_data.items():
+        if key not in INSERTABLE_FIELDS:
+            continue
+        column_type = Contact.__table__.c[key].type
+        python_type = column_type.python_type
+        if isinstance(value, bool):
+            # bool is an int subclass, but true/false is never a score or an id
+            raise ValueError(f'{key} must be {_TYPE_NAMES[python_type]}')
+        elif value is None or isinstance(value, python_type):
+            pass
+        elif python_type is int and isinstance(value, (float, str)):
+            try:
+                number = float(value)
+            except ValueError:
+                number = None
+            if number is None or not number.is_integer():
+                raise ValueError(f'{key} must be {_TYPE_NAMES[int]}')
+            value = int(number)
+        elif python_type is datetime and isinstance(value, str):
+            try:
+                value = datetime.fromisoformat(value)
+            except ValueError:
+                raise ValueError(f'{key} must be {_TYPE_NAMES[datetime]}')
+        elif python_type is str and isinstance(value, (int, float)):
+            value = str(value)
+        else:
+            raise ValueError(f'{key} must be {_TYPE_NAMES[python_type]}')
+        
+        if isinstance(value, str) and column_type.length and len(value) > column_type.length:
+            raise ValueError(f'{key} must be at most {column_type.length} characters')
+        row[key] = value
+    
+    for field in REQUIRED_FIELDS:
+        if not row.get(field):
+            raise ValueError(f'{field} is required')
+    return row
+
+def _contact_or_404(contact_id):
+    """
+    The contact and its company, contact_count and details included, in one
+    joined query; populate_existing() so an instance expired by commit() is
+    refreshed by this query rather than attribute by attribute
+    """
+    return Contact.query.options(*_DETAIL_OPTIONS).populate_existing().get_or_404(contact_id)
+
+def _seek_page(query, cursor_score, cursor_id, per_page, joined=True):
+    """
+    Keyset pagination: the page of contacts after (cursor_score, cursor_id) in
+    (lead score, id) descending order. One extra row is fetched to tell whether
+    there is a next page, so no COUNT runs. Returns the contact dicts, has_next
+    and the cursor of the next page (None on the last page).
+    A query over contacts alone (joined=False) picks the page's ids first, so
+    only the page's rows are joined to their companies
+    """
+    if cursor_score is not None and cursor_id is not None:
+        query = query.filter(tuple_(SORT_SCORE, Contact.id) < (cursor_score, cursor_id))
+    order = (SORT_SCORE.desc(), Contact.id.desc())
+    if not joined:
+        page_ids = query.with_entities(Contact.id).order_by(*order).limit(per_page + 1)
+        query = Contact.query.outerjoin(Company, Contact.company_id == Company.id).filter(Contact.id.in_(page_ids))
+    rows = query.with_entities(*ROW_COLUMNS).order_by(*order).limit(per_page + 1).all()
+    items = [contact_row_dict(row) for row in rows[:per_page]]
+    if len(rows) <= per_page:
+        return items, False, None
+    last = items[-1]
+    return items, True, {'cursor_score': last['lead_score'] or 0, 'cursor_id': last['id']}
+
+def _cached_total(query, endpoint, filters):
+    """
+    Number of contacts matching query, cached per endpoint and filter set: the UI
+    repeats the same filters page after page, so the COUNT over the filtered join
+    runs once
+    """
+    digest = hashlib.blake2b(orjson.dumps(filters, option=orjson.OPT_SORT_KEYS), digest_size=16).hexdigest()
+    key = f'contacts_count:{endpoint}:{digest}'
+    total = cache.get(key)
+    if total is None:
+        total = query.order_by(None).count()
+        cache.set(key, total, timeout=COUNT_CACHE_TIMEOUT)
+    return total
+
+def plan_contact_filters(filters):
+    """
+    WHERE clauses for the advanced contact search filters, or None when they can
+    never match (an inverted lead score range), so no query needs to run.
+    Duplicate values are dropped, single-value lists become equalities, and the
+    index-friendly equality/IN predicates come before the ILIKE and NULL checks
+    """
+    score_range = filters.get('lead_score_range') or {}
+    min_score, max_score = score_range.get('min'), score_range.get('max')
+    if min_score is not None and max_score is not None and min_score > max_score:
+        return None
+    
+    conditions = []
+    for key, column in _VALUE_FILTERS:
+        values = list(dict.fromkeys(filters.get(key) or ()))
+        if len(values) == 1:
+            conditions.append(column == values[0])
+        elif values:
+            conditions.append(column.in_(values))
+    
+    if min_score is not None:
+        conditions.append(Contact.lead_score >= min_score)
+    if max_score is not None:
+        conditions.append(Contact.lead_score <= max_score)
+    
+    titles = list(dict.fromkeys(filters.get('job_titles') or ()))
+    if titles:
+        conditions.append(or_(*(Contact.job_title.ilike(f'%{title}%') for title in titles)))
+    
+    for key, column in (('has_email', Contact.email), ('has_phone', Contact.phone)):
+        if key in filters:
+            if filters[key]:
+                conditions.append(and_(column.isnot(None), column != ''))
+            else:
+                conditions.append(or_(column.is_(None), column == ''))
+    
+    return conditions
+
+def _search_condition(search):
+    """
+    Free-text contact search over name, email, job title and company name. On
+    PostgreSQL every search word is matched as a prefix through the full-text
+    indexes; the matching company ids are collected first (an ARRAY() InitPlan)
+    so both halves of the OR can be index scans. Elsewhere, or when the search
+    holds an explicit % wildcard, a substring ILIKE on each field
+    """
+    tsquery = prefix_tsquery(search)
+    if tsquery is not None and '%' not in search and db.engine.dialect.name == 'postgresql':
+        company_ids = select(Company.id).where(NAME_DOCUMENT.op('@@')(tsquery)).scalar_subquery()
+        return or_(
+            SEARCH_DOCUMENT.op('@@')(tsquery),
+            Contact.company_id == any_(func.array(company_ids))
+        )
+    return or_(
+        Contact.first_name.ilike(f'%{search}%'),
+        Contact.last_name.ilike(f'%{search}%'),
+        Contact.email.ilike(f'%{search}%'),
+        Contact.job_title.ilike(f'%{search}%'),
+        Company.name.ilike(f'%{search}%')
+    )
+
 @contacts_bp.route('/contacts', methods=['GET'])
 def get_contacts():
     """Get contacts with optional filtering"""
-    page = request.args.get('page', 1, type=int)
+    cursor_score = request.args.get('cursor_score', type=int)
+    cursor_id = request.args.get('cursor_id', type=int)
     per_page = request.args.get('per_page', 20, type=int)
     
     # Build query with joins
@@ -18,24 +228,24 @@ def get_contacts():
     # Search filters
     search = request.args.get('search')
     if search:
-        query = query.filter(or_(
-            Contact.first_name.ilike(f'%{search}%'),
-            Contact.last_name.ilike(f'%{search}%'),
-            Contact.email.ilike(f'%{search}%'),
-            Contact.job_title.ilike(f'%{search}%'),
-            Company.name.ilike(f'%{search}%')
-        ))
+        query = query.filter(_search_condition(search))
     
     # Job title filter
     job_title = request.args.get('job_title')
     if job_title:
         query = query.filter(Contact.job_title.ilike(f'%{job_title}%'))
     
-    # Department filter
+    # Department filter; department_prefix and country_prefix match the start of
+    # the value, ignoring case, through the lower() indexes, the plain parameters
+    # keep matching substrings
     department = request.args.get('department')
     if department:
         query = query.filter(Contact.department.ilike(f'%{department}%'))
     
+    department_prefix = request.args.get('department_prefix')
+    if department_prefix:
+        query = query.filter(LOWER_DEPARTMENT.startswith(department_prefix.lower(), autoescape=True))
+    
     # Seniority level filter
     seniority = request.args.get('seniority_level')
     if seniority:
@@ -46,6 +256,10 @@ def get_contacts():
     if country:
         query = query.filter(Contact.location_country.ilike(f'%{country}%'))
     
+    country_prefix = request.args.get('country_prefix')
+    if country_prefix:
+        query = query.filter(LOWER_COUNTRY.startswith(country_prefix.lower(), autoescape=True))
+    
     state = request.args.get('state')
     if state:
         query = query.filter(Contact.location_state.ilike(f'%{state}%'))
@@ -91,20 +305,16 @@ def get_contacts():
         query = query.filter(or_(Contact.phone.is_(None), Contact.phone == ''))
     
     # Execute paginated query
-    contacts = query.paginate(
-        page=page, 
-        per_page=per_page, 
-        error_out=False
-    )
+    contacts, has_next, next_cursor = _seek_page(query, cursor_score, cursor_id, per_page)
+    filter_args = {key: value for key, value in request.args.items() if key not in PAGING_ARGS}
     
     return jsonify({
-        'contacts': [contact.to_dict() for contact in contacts.items],
-        'total': contacts.total,
-        'pages': contacts.pages,
-        'current_page': page,
+        'contacts': contacts,
+        'total': _cached_total(query, 'list', filter_args),
         'per_page': per_page,
-        'has_next': contacts.has_next,
-        'has_prev': contacts.has_prev
+        'next_cursor': next_cursor,
+        'has_next': has_next,
+        'has_prev': cursor_id is not None
     })
 
 @contacts_bp.route('/contacts', methods=['POST'])
@@ -130,32 +340,31 @@ def create_contact():
     )
     
     db.session.add(contact)
+    db.session.flush()
+    contact_id = contact.id
     db.session.commit()
     
-    return jsonify(contact.to_dict()), 201
+    return jsonify(_contact_or_404(contact_id).to_dict()), 201
 
 @contacts_bp.route('/contacts/<int:contact_id>', methods=['GET'])
 def get_contact(contact_id):
     """Get a specific contact by ID"""
-    contact = Contact.query.get_or_404(contact_id)
-    return jsonify(contact.to_dict())
+    return jsonify(_contact_or_404(contact_id).to_dict())
 
 @contacts_bp.route('/contacts/<int:contact_id>', methods=['PUT'])
 def update_contact(contact_id):
     """Update a contact"""
-    contact = Contact.query.get_or_404(contact_id)
+    # The company isn't needed until the updated contact is read back
+    contact = Contact.query.options(lazyload(Contact.company)).get_or_404(contact_id)
     data = request.json
     
     # Update fields if provided
-    for field in ['company_id', 'first_name', 'last_name', 'email', 'phone', 
-                  'job_title', 'department', 'seniority_level', 'linkedin_url', 
-                  'twitter_url', 'location_country', 'location_state', 
-                  'location_city', 'lead_score']:
+    for field in UPDATABLE_FIELDS:
         if field in data:
             setattr(contact, field, data[field])
     
     db.session.commit()
-    return jsonify(contact.to_dict())
+    return jsonify(_contact_or_404(contact_id).to_dict())
 
 @contacts_bp.route('/contacts/<int:contact_id>', methods=['DELETE'])
 def delete_contact(contact_id):
@@ -170,67 +379,41 @@ def advanced_contact_search():
     """Advanced contact search with complex filters"""
     data = request.json
     filters = data.get('filters', {})
-    page = data.get('page', 1)
+    cursor_score = data.get('cursor_score')
+    cursor_id = data.get('cursor_id')
     per_page = data.get('per_page', 20)
     
-    query = Contact.query.join(Company, Contact.company_id == Company.id, isouter=True)
-    
-    # Apply filters from the request
-    if 'job_titles' in filters and filters['job_titles']:
-        title_conditions = []
-        for title in filters['job_titles']:
-            title_conditions.append(Contact.job_title.ilike(f'%{title}%'))
-        query = query.filter(or_(*title_conditions))
-    
-    if 'departments' in filters and filters['departments']:
-        query = query.filter(Contact.department.in_(filters['departments']))
-    
-    if 'seniority_levels' in filters and filters['seniority_levels']:
-        query = query.filter(Contact.seniority_level.in_(filters['seniority_levels']))
-    
-    if 'countries' in filters and filters['countries']:
-        query = query.filter(Contact.location_country.in_(filters['countries']))
-    
-    if 'company_industries' in filters and filters['company_industries']:
-        query = query.filter(Company.industry.in_(filters['company_industries']))
-    
-    if 'company_sizes' in filters and filters['company_sizes']:
-        query = query.filter(Company.company_size.in_(filters['company_sizes']))
-    
-    if 'lead_score_range' in filters:
-        score_range = filters['lead_score_range']
-        if 'min' in score_range:
-            query = query.filter(Contact.lead_score >= score_range['min'])
-        if 'max' in score_range:
-            query = query.filter(Contact.lead_score <= score_range['max'])
-    
-    if 'has_email' in filters:
-        if filters['has_email']:
-            query = query.filter(Contact.email.isnot(None), Contact.email != '')
-        else:
-            query = query.filter(or_(Contact.email.is_(None), Contact.email == ''))
-    
-    if 'has_phone' in filters:
-        if filters['has_phone']:
-            query = query.filter(Contact.phone.isnot(None), Contact.phone != '')
-        else:
-            query = query.filter(or_(Contact.phone.is_(None), Contact.phone == ''))
+    # Companies are joined only to filter on them; otherwise the filters and the
+    # count run on contacts alone and just the page is joined
+    joined = any(filters.get(key) for key in _COMPANY_FILTERS)
+    query = Contact.query
+    if joined:
+        query = query.join(Company, Contact.company_id == Company.id, isouter=True)
+    
+    conditions = plan_contact_filters(filters)
+    if conditions is None:
+        # The filters contradict each other: nothing to query
+        return jsonify({
+            'contacts': [],
+            'total': 0,
+            'per_page': per_page,
+            'next_cursor': None,
+            'has_next': False,
+            'has_prev': cursor_id is not None,
+            'filters_applied': filters
+        })
+    query = query.filter(*conditions)
     
     # Execute paginated query
-    contacts = query.paginate(
-        page=page, 
-        per_page=per_page, 
-        error_out=False
-    )
+    contacts, has_next, next_cursor = _seek_page(query, cursor_score, cursor_id, per_page, joined)
     
     return jsonify({
-        'contacts': [contact.to_dict() for contact in contacts.items],
-        'total': contacts.total,
-        'pages': contacts.pages,
-        'current_page': page,
+        'contacts': contacts,
+        'total': _cached_total(query, 'search', filters),
         'per_page': per_page,
-        'has_next': contacts.has_next,
-        'has_prev': contacts.has_prev,
+        'next_cursor': next_cursor,
+        'has_next': has_next,
+        'has_prev': cursor_id is not None,
         'filters_applied': filters
     })
 
@@ -239,38 +422,68 @@ def bulk_create_contacts():
     """Bulk create contacts"""
     data = request.json
     contacts_data = data.get('contacts', [])
-    
+    if not isinstance(contacts_data, list) or not all(isinstance(row, dict) for row in contacts_data):
+        return jsonify({'error': 'Contacts must be a list of objects'}), 400
+    
+    # Keep only contact columns, checked and coerced before anything is written
+    rows = []
+    for index, contact_data in enumerate(contacts_data):
+        try:
+            rows.append(_bulk_contact_row(contact_data))
+        except ValueError as e:
+            return jsonify({'error': f'Contact {index}: {e}', 'index': index}), 400
+    
+    # One multi-row INSERT ... RETURNING id (insertmanyvalues) instead of
+    # building and flushing a Contact per row
+    contact_ids = []
+    try:
+        if rows:
+            contact_ids = db.session.scalars(
+                insert(Contact).returning(Contact.id, sort_by_parameter_order=True), rows
+            ).all()
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+    
+    # The created contacts read back in one query, as the list pages serialize them
     contacts = []
-    for contact_data in contacts_data:
-        contact = Contact(**contact_data)
-        contacts.append(contact)
-    
-    db.session.add_all(contacts)
-    db.session.commit()
+    if contact_ids:
+        order = {contact_id: position for position, contact_id in enumerate(contact_ids)}
+        contacts = sorted(
+            map(contact_row_dict, db.session.execute(
+                select(*ROW_COLUMNS)
+                .select_from(Contact)
+                .outerjoin(Company, Contact.company_id == Company.id)
+                .where(Contact.id.in_(contact_ids))
+            )),
+            key=lambda contact: order[contact['id']]
+        )
     
     return jsonify({
         'message': f'Successfully created {len(contacts)} contacts',
-        'contacts': [contact.to_dict() for contact in contacts]
+        'contacts': contacts
     }), 201
 
 @contacts_bp.route('/contacts/stats', methods=['GET'])
+# Short timeout, like /api/stats: writes clear a shared (Redis) cache for every
+# worker, but the per-worker SimpleCache only for the worker that wrote
+@cache.cached(timeout=30, key_prefix='contact_stats')
 def get_contact_stats():
     """Get contact database statistics"""
-    total_contacts = Contact.query.count()
-    contacts_with_email = Contact.query.filter(Contact.email.isnot(None), Contact.email != '').count()
-    contacts_with_phone = Contact.query.filter(Contact.phone.isnot(None), Contact.phone != '').count()
+    total_contacts, contacts_with_email, contacts_with_phone = db.session.execute(_COUNTS_QUERY).one()
     
-    # Top industries
+    # Top industries and job titles, ties by name; contacts without one are
+    # left out rather than counted as a NULL bucket
     industry_stats = db.session.query(
         Company.industry, 
         db.func.count(Contact.id).label('contact_count')
-    ).join(Contact).group_by(Company.industry).order_by(db.func.count(Contact.id).desc()).limit(10).all()
+    ).join(Contact).filter(Company.industry.isnot(None)).group_by(Company.industry).order_by(db.func.count(Contact.id).desc(), Company.industry).limit(10).all()
     
-    # Top job titles
     title_stats = db.session.query(
         Contact.job_title, 
         db.func.count(Contact.id).label('count')
-    ).group_by(Contact.job_title).order_by(db.func.count(Contact.id).desc()).limit(10).all()
+    ).filter(Contact.job_title.isnot(None)).group_by(Contact.job_title).order_by(db.func.count(Contact.id).desc(), Contact.job_title).limit(10).all()
     
     return jsonify({
         'total_contacts': total_contacts,
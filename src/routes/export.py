@@ -1,19 +1,124 @@
-from flask import Blueprint, jsonify, request, send_file
+from flask import Blueprint, Response, jsonify, request, send_file, stream_with_context
 import csv
 import io
-import pandas as pd
+import tempfile
+import zlib
 from datetime import datetime
+import xlsxwriter
 from src.models.user import db
-from src.models.contact import Contact
-from src.models.company import Company
+from src.models.contact import Contact, EXPORT_COLUMNS as CONTACT_EXPORT_COLUMNS
+from src.models.company import Company, EXPORT_COLUMNS as COMPANY_EXPORT_COLUMNS
 from src.models.lead_list import LeadList
 
 export_bp = Blueprint('export', __name__)
 
-@export_bp.route('/export/contacts/csv', methods=['POST'])
-def export_contacts_csv():
-    """Export contacts to CSV format for Zoho CRM"""
-    data = request.json
+# Rows fetched per round trip while exporting (server-side cursor on PostgreSQL)
+EXPORT_BATCH_SIZE = 5000
+# Streamed CSV is flushed to the client in chunks of about this many characters
+STREAM_CHUNK_SIZE = 64 * 1024
+# zlib level for gzip-encoded CSV downloads; CSV shrinks well even at fast levels
+GZIP_LEVEL = 6
+
+# Columns of the CSV exports, in the models' EXPORT_COLUMNS order. They are
+# selected as plain rows, so exporting builds no ORM objects; contact queries
+# must be outer-joined to companies
+CONTACT_EXPORT_FIELDS = (
+    Contact.first_name, Contact.last_name, Contact.email, Contact.phone, Contact.job_title,
+    Contact.department, Contact.seniority_level, Company.name, Company.website,
+    Company.industry, Company.company_size, Contact.location_country,
+    Contact.location_state, Contact.location_city, Contact.linkedin_url,
+    Contact.twitter_url, Contact.lead_score
+)
+COMPANY_EXPORT_FIELDS = (
+    Company.name, Company.website, Company.industry, Company.company_size,
+    Company.location_country, Company.location_state, Company.location_city,
+    Company.founded_year, Company.funding_status, Company.linkedin_url,
+    Company.phone, Company.description
+)
+
+# Positions of the email and phone columns in contact export rows
+EMAIL_INDEX = CONTACT_EXPORT_COLUMNS.index('Email')
+PHONE_INDEX = CONTACT_EXPORT_COLUMNS.index('Phone')
+
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Zoho CRM import template: its columns and one sample row, in column order
+ZOHO_TEMPLATE_COLUMNS = (
+    'First Name', 'Last Name', 'Email', 'Phone', 'Job Title',
+    'Company Name', 'Company Website', 'Company Industry',
+    'Company Size', 'Country', 'State', 'City', 'LinkedIn URL'
+)
+ZOHO_TEMPLATE_SAMPLE = (
+    'John', 'Doe', 'john.doe@example.com', '+1-555-123-4567', 'CEO',
+    'Example Corp', 'https://example.com', 'Technology',
+    '50-100', 'United States', 'California', 'San Francisco', 'https://linkedin.com/in/johndoe'
+)
+
+def export_rows(query, fields):
+    """Rows of fields for everything query matches, fetched in batches"""
+    return query.with_entities(*fields).yield_per(EXPORT_BATCH_SIZE)
+
+def stream_csv(header, rows):
+    """Yield CSV text for header and rows in chunks, never holding the whole file"""
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(header)
+    for row in rows:
+        writer.writerow(row)
+        if output.tell() >= STREAM_CHUNK_SIZE:
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate()
+    yield output.getvalue()
+
+def csv_text(header, rows):
+    """The whole CSV as one string plus its number of rows, for the JSON responses"""
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(header)
+    total = 0
+    for row in rows:
+        writer.writerow(row)
+        total += 1
+    return output.getvalue(), total
+
+# The template never changes, so its CSV text is written once
+ZOHO_TEMPLATE_CSV, _ = csv_text(ZOHO_TEMPLATE_COLUMNS, (ZOHO_TEMPLATE_SAMPLE,))
+
+def gzip_chunks(chunks):
+    """Yield chunks of text as one gzip stream, compressing as they are produced"""
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk.encode())
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+def wants_download(flag, mimetype):
+    """
+    Whether to answer with a file download of mimetype instead of JSON: asked
+    for explicitly, or the client prefers mimetype over JSON in its Accept header
+    """
+    return bool(flag) or request.accept_mimetypes.best_match(('application/json', mimetype)) == mimetype
+
+def csv_download(header, rows, filename):
+    """
+    text/csv attachment response streaming rows as they are read from the
+    database, gzip-encoded for clients that accept it
+    """
+    chunks = stream_csv(header, rows)
+    headers = {'Content-Disposition': f'attachment; filename={filename}', 'Vary': 'Accept-Encoding'}
+    if 'gzip' in request.accept_encodings:
+        chunks = gzip_chunks(chunks)
+        headers['Content-Encoding'] = 'gzip'
+    return Response(stream_with_context(chunks), mimetype='text/csv', headers=headers)
+
+def contact_export_query(data):
+    """
+    Contacts query of a contact export request body, outer-joined to companies:
+    the contacts of list_id, or every contact matching filters (the advanced
+    search filters)
+    """
     filters = data.get('filters', {})
     list_id = data.get('list_id')
     
@@ -21,7 +126,7 @@ def export_contacts_csv():
     if list_id:
         # Export from specific list
         lead_list = LeadList.query.get_or_404(list_id)
-        contacts = lead_list.contacts.all()
+        query = lead_list.contacts.outerjoin(Company, Contact.company_id == Company.id)
     else:
         # Export based on filters
         query = Contact.query.join(Company, Contact.company_id == Company.id, isouter=True)
@@ -53,35 +158,29 @@ def export_contacts_csv():
         
         if 'has_phone' in filters and filters['has_phone']:
             query = query.filter(Contact.phone.isnot(None), Contact.phone != '')
-        
-        contacts = query.all()
     
-    # Create CSV data
-    output = io.StringIO()
-    writer = csv.DictWriter(output, fieldnames=[
-        'First Name', 'Last Name', 'Email', 'Phone', 'Job Title', 
-        'Department', 'Seniority Level', 'Company Name', 'Company Website',
-        'Company Industry', 'Company Size', 'Country', 'State', 'City',
-        'LinkedIn URL', 'Twitter URL', 'Lead Score'
-    ])
-    
-    writer.writeheader()
-    for contact in contacts:
-        writer.writerow(contact.to_export_dict())
-    
-    # Create file-like object
-    output.seek(0)
-    csv_data = output.getvalue()
-    output.close()
+    return query
+
+@export_bp.route('/export/contacts/csv', methods=['POST'])
+def export_contacts_csv():
+    """Export contacts to CSV format for Zoho CRM"""
+    data = request.json
+    query = contact_export_query(data)
     
-    # Create response
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     filename = f'leads_export_{timestamp}.csv'
     
+    # Stream a text/csv download straight from the cursor when asked to
+    if wants_download(data.get('stream'), 'text/csv'):
+        return csv_download(CONTACT_EXPORT_COLUMNS, export_rows(query, CONTACT_EXPORT_FIELDS), filename)
+    
+    # Create CSV data
+    csv_data, total = csv_text(CONTACT_EXPORT_COLUMNS, export_rows(query, CONTACT_EXPORT_FIELDS))
+    
     return {
         'csv_data': csv_data,
         'filename': filename,
-        'total_contacts': len(contacts),
+        'total_contacts': total,
         'export_timestamp': datetime.now().isoformat()
     }
 
@@ -89,61 +188,57 @@ def export_contacts_csv():
 def export_contacts_excel():
     """Export contacts to Excel format"""
     data = request.json
-    filters = data.get('filters', {})
-    list_id = data.get('list_id')
-    
-    # Build query (same logic as CSV export)
-    if list_id:
-        lead_list = LeadList.query.get_or_404(list_id)
-        contacts = lead_list.contacts.all()
-    else:
-        query = Contact.query.join(Company, Contact.company_id == Company.id, isouter=True)
-        
-        # Apply filters (same as CSV)
-        if 'job_titles' in filters and filters['job_titles']:
-            title_conditions = []
-            for title in filters['job_titles']:
-                title_conditions.append(Contact.job_title.ilike(f'%{title}%'))
-            query = query.filter(db.or_(*title_conditions))
-        
-        if 'has_email' in filters and filters['has_email']:
-            query = query.filter(Contact.email.isnot(None), Contact.email != '')
-        
-        contacts = query.all()
+    query = contact_export_query(data)
     
-    # Create DataFrame
-    contact_data = [contact.to_export_dict() for contact in contacts]
-    df = pd.DataFrame(contact_data)
+    # Rows go straight from the cursor to the worksheet; constant_memory mode
+    # flushes each row to a temporary file, and the workbook itself is written
+    # to one, so neither the rows nor the .xlsx are held in memory
+    output = tempfile.TemporaryFile()
+    workbook = xlsxwriter.Workbook(output, {
+        'constant_memory': True,
+        'strings_to_formulas': False,
+        'strings_to_urls': False
+    })
+    header_format = workbook.add_format({'bold': True})
     
-    # Create Excel file in memory
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, sheet_name='Leads', index=False)
-        
-        # Add a summary sheet
-        summary_data = {
-            'Metric': ['Total Contacts', 'Contacts with Email', 'Contacts with Phone', 'Export Date'],
-            'Value': [
-                len(contacts),
-                len([c for c in contacts if c.email]),
-                len([c for c in contacts if c.phone]),
-                datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            ]
-        }
-        summary_df = pd.DataFrame(summary_data)
-        summary_df.to_excel(writer, sheet_name='Summary', index=False)
+    leads = workbook.add_worksheet('Leads')
+    leads.write_row(0, 0, CONTACT_EXPORT_COLUMNS, header_format)
+    total = with_email = with_phone = 0
+    for total, row in enumerate(export_rows(query, CONTACT_EXPORT_FIELDS), start=1):
+        leads.write_row(total, 0, row)
+        if row[EMAIL_INDEX]:
+            with_email += 1
+        if row[PHONE_INDEX]:
+            with_phone += 1
     
-    output.seek(0)
-    excel_data = output.getvalue()
-    output.close()
+    # Add a summary sheet
+    summary = workbook.add_worksheet('Summary')
+    summary.write_row(0, 0, ('Metric', 'Value'), header_format)
+    summary.write_row(1, 0, ('Total Contacts', total))
+    summary.write_row(2, 0, ('Contacts with Email', with_email))
+    summary.write_row(3, 0, ('Contacts with Phone', with_phone))
+    summary.write_row(4, 0, ('Export Date', datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+    workbook.close()
     
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     filename = f'leads_export_{timestamp}.xlsx'
     
+    # The workbook as a binary download when asked to, streamed from the file
+    # (closed with the response)
+    output.seek(0)
+    if wants_download(data.get('download'), XLSX_MIMETYPE):
+        response = send_file(output, mimetype=XLSX_MIMETYPE, as_attachment=True, download_name=filename)
+        response.headers['X-Export-Total'] = total
+        return response
+    
+    # The JSON body carries the whole workbook, hex-encoded
+    with output:
+        excel_data = output.read().hex()
+    
     return {
-        'excel_data': excel_data.hex(),  # Convert to hex for JSON response
+        'excel_data': excel_data,  # Convert to hex for JSON response
         'filename': filename,
-        'total_contacts': len(contacts),
+        'total_contacts': total,
         'export_timestamp': datetime.now().isoformat()
     }
 
@@ -151,33 +246,23 @@ def export_contacts_excel():
 def export_list_csv(list_id):
     """Export a specific list to CSV"""
     lead_list = LeadList.query.get_or_404(list_id)
-    contacts = lead_list.contacts.all()
-    
-    # Create CSV data
-    output = io.StringIO()
-    writer = csv.DictWriter(output, fieldnames=[
-        'First Name', 'Last Name', 'Email', 'Phone', 'Job Title', 
-        'Department', 'Seniority Level', 'Company Name', 'Company Website',
-        'Company Industry', 'Company Size', 'Country', 'State', 'City',
-        'LinkedIn URL', 'Twitter URL', 'Lead Score'
-    ])
-    
-    writer.writeheader()
-    for contact in contacts:
-        writer.writerow(contact.to_export_dict())
-    
-    output.seek(0)
-    csv_data = output.getvalue()
-    output.close()
+    query = lead_list.contacts.outerjoin(Company, Contact.company_id == Company.id)
     
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     filename = f'{lead_list.name.replace(" ", "_")}_{timestamp}.csv'
     
+    # Stream a text/csv download straight from the cursor when asked to
+    if wants_download(request.args.get('stream') == 'true', 'text/csv'):
+        return csv_download(CONTACT_EXPORT_COLUMNS, export_rows(query, CONTACT_EXPORT_FIELDS), filename)
+    
+    # Create CSV data
+    csv_data, total = csv_text(CONTACT_EXPORT_COLUMNS, export_rows(query, CONTACT_EXPORT_FIELDS))
+    
     return {
         'csv_data': csv_data,
         'filename': filename,
         'list_name': lead_list.name,
-        'total_contacts': len(contacts),
+        'total_contacts': total,
         'export_timestamp': datetime.now().isoformat()
     }
 
@@ -199,72 +284,28 @@ def export_companies_csv():
     if 'countries' in filters and filters['countries']:
         query = query.filter(Company.location_country.in_(filters['countries']))
     
-    companies = query.all()
-    
-    # Create CSV data
-    output = io.StringIO()
-    writer = csv.DictWriter(output, fieldnames=[
-        'Company Name', 'Website', 'Industry', 'Company Size', 'Country',
-        'State', 'City', 'Founded Year', 'Funding Status', 'LinkedIn URL',
-        'Phone', 'Description'
-    ])
-    
-    writer.writeheader()
-    for company in companies:
-        writer.writerow(company.to_export_dict())
-    
-    output.seek(0)
-    csv_data = output.getvalue()
-    output.close()
-    
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     filename = f'companies_export_{timestamp}.csv'
     
+    # Stream a text/csv download straight from the cursor when asked to
+    if wants_download(data.get('stream'), 'text/csv'):
+        return csv_download(COMPANY_EXPORT_COLUMNS, export_rows(query, COMPANY_EXPORT_FIELDS), filename)
+    
+    # Create CSV data
+    csv_data, total = csv_text(COMPANY_EXPORT_COLUMNS, export_rows(query, COMPANY_EXPORT_FIELDS))
+    
     return {
         'csv_data': csv_data,
         'filename': filename,
-        'total_companies': len(companies),
+        'total_companies': total,
         'export_timestamp': datetime.now().isoformat()
     }
 
 @export_bp.route('/export/zoho-template', methods=['GET'])
 def get_zoho_template():
     """Get Zoho CRM import template"""
-    template_fields = [
-        'First Name', 'Last Name', 'Email', 'Phone', 'Job Title',
-        'Company Name', 'Company Website', 'Company Industry', 
-        'Company Size', 'Country', 'State', 'City', 'LinkedIn URL'
-    ]
-    
-    output = io.StringIO()
-    writer = csv.DictWriter(output, fieldnames=template_fields)
-    writer.writeheader()
-    
-    # Add sample row
-    sample_row = {
-        'First Name': 'John',
-        'Last Name': 'Doe',
-        'Email': 'john.doe@example.com',
-        'Phone': '+1-555-123-4567',
-        'Job Title': 'CEO',
-        'Company Name': 'Example Corp',
-        'Company Website': 'https://example.com',
-        'Company Industry': 'Technology',
-        'Company Size': '50-100',
-        'Country': 'United States',
-        'State': 'California',
-        'City': 'San Francisco',
-        'LinkedIn URL': 'https://linkedin.com/in/johndoe'
-    }
-    writer.writerow(sample_row)
-    
-    output.seek(0)
-    csv_data = output.getvalue()
-    output.close()
-    
     return {
-        'csv_data': csv_data,
+        'csv_data': ZOHO_TEMPLATE_CSV,
         'filename': 'zoho_crm_template.csv',
         'description': 'Template for Zoho CRM import with sample data'
     }
-
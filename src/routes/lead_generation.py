@@ -1,12 +1,87 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from flask import Blueprint, request, jsonify
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import selectinload
 from src.models.user import db
-from src.models.company import Company
+from src.models.company import Company, DICT_COLUMNS as COMPANY_COLUMNS
 from src.models.contact import Contact
-from src.services.lead_generation import LeadGenerationService
+from src.models.rows import ROW_COLUMNS, contact_row_dict
 from datetime import datetime
 
 lead_gen_bp = Blueprint('lead_generation', __name__)
-lead_service = LeadGenerationService()
+
+# Optional fields of generated companies and contacts that are saved with them
+GENERATED_COMPANY_FIELDS = (
+    'industry', 'website', 'domain', 'location_country', 'location_city',
+    'company_size', 'description', 'founded_year', 'funding_status',
+    'funding_amount', 'linkedin_url', 'technology_stack'
+)
+GENERATED_CONTACT_FIELDS = (
+    'email', 'phone', 'job_title', 'department', 'seniority_level',
+    'linkedin_url', 'location_country', 'location_city'
+)
+
+# Company and contact columns an enrichment may fill in; other keys of the
+# enriched dicts (full_name, company, contact_count...) are not columns
+ENRICHABLE_COMPANY_FIELDS = frozenset(Company.__table__.columns.keys()) - {'id', 'created_at', 'updated_at'}
+ENRICHABLE_CONTACT_FIELDS = frozenset(Contact.__table__.columns.keys()) - {'id', 'created_at', 'updated_at'}
+
+# Contacts loaded, enriched and updated together by /enrich/bulk
+ENRICH_BATCH_SIZE = 1000
+# Contacts /enrich/bulk enriches at once: enrichment waits on DNS and SMTP
+# lookups, so threads overlap those waits
+ENRICH_WORKERS = 8
+
+# Loader options for the to_dict() of enriched contacts
+_CONTACT_OPTIONS = (selectinload(Contact.company).undefer(Company.contact_count).undefer_group('details'),)
+
+def _company_row(company_data):
+    """INSERT parameters of a generated company"""
+    row = {field: company_data.get(field) for field in GENERATED_COMPANY_FIELDS}
+    row['name'] = company_data['name']
+    return row
+
+def _contact_row(contact_data, company_id):
+    """INSERT parameters of a generated contact of the company company_id"""
+    row = {field: contact_data.get(field) for field in GENERATED_CONTACT_FIELDS}
+    row.update(
+        company_id=company_id,
+        first_name=contact_data['first_name'],
+        last_name=contact_data['last_name'],
+        lead_score=contact_data.get('lead_score', 0)
+    )
+    return row
+
+def _enrichment_update(contact_data, enriched_data):
+    """
+    UPDATE parameters applying an enrichment of contact_data: the contact
+    columns it set to a new value (never to None)
+    """
+    row = {
+        key: value for key, value in enriched_data.items()
+        if key in ENRICHABLE_CONTACT_FIELDS and value is not None and value != contact_data.get(key)
+    }
+    row['id'] = contact_data['id']
+    row['updated_at'] = datetime.utcnow()
+    return row
+
+def _companies_by_name(condition):
+    """
+    to_dict() of the companies matching condition by name, the oldest one where
+    names repeat, built from plain rows rather than ORM instances
+    """
+    companies = {}
+    for row in db.session.execute(select(*COMPANY_COLUMNS).where(condition).order_by(Company.id)):
+        company = Company.row_dict(row)
+        companies.setdefault(company['name'], company)
+    return companies
+
+@lru_cache(maxsize=None)
+def get_lead_service():
+    """Build the lead generation service on first use (it pulls in requests, bs4 and dnspython)"""
+    from src.services.lead_generation import LeadGenerationService
+    return LeadGenerationService()
 
 @lead_gen_bp.route('/generate/industry', methods=['POST'])
 def generate_leads_by_industry():
@@ -22,66 +97,59 @@ def generate_leads_by_industry():
             return jsonify({'error': 'Industry is required'}), 400
         
         # Generate leads
-        results = lead_service.generate_leads_by_industry(industry, location, limit)
+        results = get_lead_service().generate_leads_by_industry(industry, location, limit)
         
         saved_companies = []
         saved_contacts = []
         
         if save_to_db:
-            # Save companies to database
+            # Every company the leads name, generated or referenced by a contact,
+            # looked up in one query
+            names = {company_data['name'] for company_data in results['companies']}
+            names.update(contact_data['company_name'] for contact_data in results['contacts'])
+            companies_by_name = _companies_by_name(Company.name.in_(names))
+            
+            # Save the companies not in the database yet, each name once, with one
+            # multi-row INSERT ... RETURNING id
+            new_companies = {}
             for company_data in results['companies']:
-                # Check if company already exists
-                existing_company = Company.query.filter_by(name=company_data['name']).first()
-                if not existing_company:
-                    company = Company(
-                        name=company_data['name'],
-                        industry=company_data.get('industry'),
-                        website=company_data.get('website'),
-                        domain=company_data.get('domain'),
-                        location_country=company_data.get('location_country'),
-                        location_city=company_data.get('location_city'),
-                        company_size=company_data.get('company_size'),
-                        description=company_data.get('description'),
-                        founded_year=company_data.get('founded_year'),
-                        funding_status=company_data.get('funding_status'),
-                        funding_amount=company_data.get('funding_amount'),
-                        linkedin_url=company_data.get('linkedin_url'),
-                        technology_stack=company_data.get('technology_stack')
-                    )
-                    db.session.add(company)
-                    db.session.flush()  # Get the ID
-                    saved_companies.append(company.to_dict())
-                else:
-                    saved_companies.append(existing_company.to_dict())
+                if company_data['name'] not in companies_by_name:
+                    new_companies.setdefault(company_data['name'], _company_row(company_data))
+            if new_companies:
+                company_ids = db.session.scalars(
+                    insert(Company).returning(Company.id), list(new_companies.values())
+                ).all()
+                companies_by_name.update(_companies_by_name(Company.id.in_(company_ids)))
+            saved_companies = [companies_by_name[company_data['name']] for company_data in results['companies']]
             
-            # Save contacts to database
+            # Save the contacts of known companies that aren't there yet, by
+            # (email, company), again with a single INSERT
+            existing_contacts = set(map(tuple, db.session.query(Contact.email, Contact.company_id).filter(
+                Contact.company_id.in_([company['id'] for company in companies_by_name.values()])
+            )))
+            new_contacts = []
             for contact_data in results['contacts']:
-                # Find the company
-                company = Company.query.filter_by(name=contact_data['company_name']).first()
+                company = companies_by_name.get(contact_data['company_name'])
                 if company:
-                    # Check if contact already exists
-                    existing_contact = Contact.query.filter_by(
-                        email=contact_data.get('email'),
-                        company_id=company.id
-                    ).first()
-                    
-                    if not existing_contact:
-                        contact = Contact(
-                            company_id=company.id,
-                            first_name=contact_data['first_name'],
-                            last_name=contact_data['last_name'],
-                            email=contact_data.get('email'),
-                            phone=contact_data.get('phone'),
-                            job_title=contact_data.get('job_title'),
-                            department=contact_data.get('department'),
-                            seniority_level=contact_data.get('seniority_level'),
-                            linkedin_url=contact_data.get('linkedin_url'),
-                            location_country=contact_data.get('location_country'),
-                            location_city=contact_data.get('location_city'),
-                            lead_score=contact_data.get('lead_score', 0)
-                        )
-                        db.session.add(contact)
-                        saved_contacts.append(contact.to_dict())
+                    key = (contact_data.get('email'), company['id'])
+                    if key not in existing_contacts:
+                        existing_contacts.add(key)
+                        new_contacts.append(_contact_row(contact_data, company['id']))
+            if new_contacts:
+                contact_ids = db.session.scalars(
+                    insert(Contact).returning(Contact.id, sort_by_parameter_order=True), new_contacts
+                ).all()
+                # Read back as plain contact/company rows, in insertion order
+                order = {contact_id: position for position, contact_id in enumerate(contact_ids)}
+                saved_contacts = sorted(
+                    map(contact_row_dict, db.session.execute(
+                        select(*ROW_COLUMNS)
+                        .select_from(Contact)
+                        .outerjoin(Company, Contact.company_id == Company.id)
+                        .where(Contact.id.in_(contact_ids))
+                    )),
+                    key=lambda contact: order[contact['id']]
+                )
             
             db.session.commit()
         
@@ -114,11 +182,11 @@ def enrich_company(company_id):
         company_data = company.to_dict()
         
         # Enrich the data
-        enriched_data = lead_service.enrich_company_data(company_data)
+        enriched_data = get_lead_service().enrich_company_data(company_data)
         
         # Update company with enriched data
         for key, value in enriched_data.items():
-            if hasattr(company, key) and value is not None:
+            if key in ENRICHABLE_COMPANY_FIELDS and value is not None:
                 setattr(company, key, value)
         
         company.updated_at = datetime.utcnow()
@@ -142,11 +210,11 @@ def enrich_contact(contact_id):
         contact_data = contact.to_dict()
         
         # Enrich the data
-        enriched_data = lead_service.enrich_contact_data(contact_data)
+        enriched_data = get_lead_service().enrich_contact_data(contact_data)
         
         # Update contact with enriched data
         for key, value in enriched_data.items():
-            if hasattr(contact, key) and value is not None:
+            if key in ENRICHABLE_CONTACT_FIELDS and value is not None:
                 setattr(contact, key, value)
         
         contact.updated_at = datetime.utcnow()
@@ -172,27 +240,38 @@ def bulk_enrich():
         
         enriched_count = 0
         failed_count = 0
-        
-        for contact_id in contact_ids:
-            try:
-                contact = Contact.query.get(contact_id)
-                if contact:
-                    # Enrich contact data
-                    contact_data = contact.to_dict()
-                    enriched_data = lead_service.enrich_contact_data(contact_data)
-                    
-                    # Update contact
-                    for key, value in enriched_data.items():
-                        if hasattr(contact, key) and value is not None:
-                            setattr(contact, key, value)
-                    
-                    contact.updated_at = datetime.utcnow()
+        lead_service = get_lead_service()
+        
+        # Contacts are loaded one batch of ids at a time and enriched on a thread
+        # pool; the database work stays on this thread, and each batch's
+        # enrichments are written with one executemany UPDATE by primary key
+        with ThreadPoolExecutor(max_workers=ENRICH_WORKERS) as executor:
+            for start in range(0, len(contact_ids), ENRICH_BATCH_SIZE):
+                batch = contact_ids[start:start + ENRICH_BATCH_SIZE]
+                contacts = {
+                    contact.id: contact
+                    for contact in Contact.query.options(*_CONTACT_OPTIONS).filter(Contact.id.in_(batch))
+                }
+                found = [(contact_id, contacts[contact_id].to_dict()) for contact_id in batch if contact_id in contacts]
+                failed_count += len(batch) - len(found)
+                
+                # Enrich contact data
+                futures = [
+                    executor.submit(lead_service.enrich_contact_data, contact_data) for _, contact_data in found
+                ]
+                updates = []
+                for (contact_id, contact_data), future in zip(found, futures):
+                    try:
+                        enriched_data = future.result()
+                    except Exception as e:
+                        failed_count += 1
+                        print(f"Error enriching contact {contact_id}: {e}")
+                        continue
+                    updates.append(_enrichment_update(contact_data, enriched_data))
                     enriched_count += 1
-                else:
-                    failed_count += 1
-            except Exception as e:
-                failed_count += 1
-                print(f"Error enriching contact {contact_id}: {e}")
+                
+                if updates:
+                    db.session.execute(update(Contact), updates)
         
         db.session.commit()
         
@@ -223,7 +302,7 @@ def search_companies():
         # Remove empty criteria
         criteria = {k: v for k, v in criteria.items() if v}
         
-        companies = lead_service.search_companies_by_criteria(criteria)
+        companies = get_lead_service().search_companies_by_criteria(criteria)
         
         return jsonify({
             'success': True,
@@ -246,7 +325,7 @@ def find_company_contacts():
         if not company_name:
             return jsonify({'error': 'Company name is required'}), 400
         
-        contacts = lead_service.find_company_contacts(company_name, company_domain)
+        contacts = get_lead_service().find_company_contacts(company_name, company_domain)
         
         return jsonify({
             'success': True,
@@ -269,6 +348,7 @@ def validate_email():
             return jsonify({'error': 'Email addresses are required'}), 400
         
         results = []
+        lead_service = get_lead_service()
         for email in emails:
             is_valid = lead_service.validate_email(email)
             results.append({
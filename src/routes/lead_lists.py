@@ -1,17 +1,26 @@
 from flask import Blueprint, jsonify, request
+from sqlalchemy import exists, insert, select
+from sqlalchemy.orm import undefer
+from src.cache import cache
 from src.models.user import db
 from src.models.lead_list import LeadList, LeadListContact, SavedSearch
 from src.models.contact import Contact
+from src.models.rows import ROW_COLUMNS, contact_row_dict
+from src.models.company import Company
 
 lead_lists_bp = Blueprint('lead_lists', __name__)
 
+# Contact ids per DELETE of /lists/<id>/contacts/bulk: one bound parameter each,
+# under SQLite's historical limit of 999 with room for the list id
+REMOVE_BATCH_SIZE = 900
+
 @lead_lists_bp.route('/lists', methods=['GET'])
 def get_lead_lists():
     """Get all lead lists"""
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
     
-    lists = LeadList.query.paginate(
+    lists = LeadList.query.options(undefer(LeadList.contact_count)).paginate(
         page=page, 
         per_page=per_page, 
         error_out=False
@@ -46,12 +55,16 @@ def create_lead_list():
 @lead_lists_bp.route('/lists/<int:list_id>', methods=['GET'])
 def get_lead_list(list_id):
     """Get a specific lead list with its contacts"""
-    lead_list = LeadList.query.get_or_404(list_id)
+    lead_list = LeadList.query.options(undefer(LeadList.contact_count)).get_or_404(list_id)
     
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
     
-    contacts = lead_list.contacts.paginate(
+    # Plain contact/company rows rather than ORM objects, as on the contact pages,
+    # in the order the contacts were added so pages don't shift between requests
+    contacts = lead_list.contacts.outerjoin(
+        Company, Contact.company_id == Company.id
+    ).with_entities(*ROW_COLUMNS).order_by(LeadListContact.id).paginate(
         page=page, 
         per_page=per_page, 
         error_out=False
@@ -59,7 +72,7 @@ def get_lead_list(list_id):
     
     return jsonify({
         'list': lead_list.to_dict(),
-        'contacts': [contact.to_dict() for contact in contacts.items],
+        'contacts': [contact_row_dict(row) for row in contacts.items],
         'total_contacts': contacts.total,
         'pages': contacts.pages,
         'current_page': page,
@@ -93,28 +106,22 @@ def add_contacts_to_list(list_id):
     """Add contacts to a lead list"""
     lead_list = LeadList.query.get_or_404(list_id)
     data = request.json
-    contact_ids = data.get('contact_ids', [])
-    
-    added_count = 0
-    for contact_id in contact_ids:
-        # Check if contact exists
-        contact = Contact.query.get(contact_id)
-        if not contact:
-            continue
-            
-        # Check if already in list
-        existing = LeadListContact.query.filter_by(
-            list_id=list_id, 
-            contact_id=contact_id
-        ).first()
-        
-        if not existing:
-            list_contact = LeadListContact(
-                list_id=list_id,
-                contact_id=contact_id
-            )
-            db.session.add(list_contact)
-            added_count += 1
+    contact_ids = list(dict.fromkeys(data.get('contact_ids', [])))
+    
+    # The contacts that exist and aren't on the list yet, found in one query and
+    # added, in request order, with one INSERT
+    new_ids = set()
+    if contact_ids:
+        new_ids = set(db.session.scalars(select(Contact.id).where(
+            Contact.id.in_(contact_ids),
+            ~exists().where(LeadListContact.list_id == list_id, LeadListContact.contact_id == Contact.id)
+        )))
+    added_ids = [contact_id for contact_id in contact_ids if contact_id in new_ids]
+    if added_ids:
+        db.session.execute(
+            insert(LeadListContact), [{'list_id': list_id, 'contact_id': contact_id} for contact_id in added_ids]
+        )
+    added_count = len(added_ids)
     
     db.session.commit()
     
@@ -142,10 +149,14 @@ def bulk_remove_contacts_from_list(list_id):
     data = request.json
     contact_ids = data.get('contact_ids', [])
     
-    removed_count = LeadListContact.query.filter(
-        LeadListContact.list_id == list_id,
-        LeadListContact.contact_id.in_(contact_ids)
-    ).delete(synchronize_session=False)
+    # One DELETE per batch of ids, committed together
+    removed_count = 0
+    for start in range(0, len(contact_ids), REMOVE_BATCH_SIZE):
+        batch = contact_ids[start:start + REMOVE_BATCH_SIZE]
+        removed_count += LeadListContact.query.filter(
+            LeadListContact.list_id == list_id,
+            LeadListContact.contact_id.in_(batch)
+        ).delete(synchronize_session=False)
     
     db.session.commit()
     
@@ -185,6 +196,8 @@ def delete_saved_search(search_id):
     return '', 204
 
 @lead_lists_bp.route('/lists/stats', methods=['GET'])
+# Kept for 30s: other workers' in-process caches aren't cleared by a write
+@cache.cached(timeout=30, key_prefix='list_stats')
 def get_list_stats():
     """Get lead list statistics"""
     total_lists = LeadList.query.count()
@@ -0,0 +1,54 @@
+import re
+from sqlalchemy import Index, cast, func, literal, text
+from sqlalchemy.dialects.postgresql import REGCONFIG
+from sqlalchemy.exc import DBAPIError
+
+# Text search configuration of the company and contact searches: no stemming or
+# stop words, so names, domains and emails are indexed as written
+SEARCH_CONFIG = cast(literal('simple'), REGCONFIG)
+
+def search_document(*columns):
+    """
+    to_tsvector() of the given columns, NULLs as empty strings and joined with
+    spaces. GIN-index the result; queries must use the same expression for the
+    planner to match the index
+    """
+    text = func.coalesce(columns[0], '')
+    for column in columns[1:]:
+        text = text + ' ' + func.coalesce(column, '')
+    return func.to_tsvector(SEARCH_CONFIG, text)
+
+def prefix_tsquery(search):
+    """
+    tsquery matching every word of search as a prefix (the closest full-text
+    equivalent of ILIKE '%search%'), or None when search has no words
+    """
+    words = re.findall(r'\w+', search)
+    if not words:
+        return None
+    return func.to_tsquery(SEARCH_CONFIG, ' & '.join(f'{word}:*' for word in words))
+
+def trigram_available(ddl, target, bind, **kw):
+    """
+    ddl_if() callable: True when the pg_trgm extension is installed, installing
+    it first when the server ships it and the role may create extensions
+    """
+    if bind.scalar(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")):
+        return True
+    if not bind.scalar(text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")):
+        return False
+    try:
+        with bind.begin_nested():
+            bind.execute(text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+    except DBAPIError:
+        return False
+    return True
+
+def trigram_index(name, column):
+    """
+    GIN trigram index on column, which lets PostgreSQL serve ILIKE '%term%' on
+    it from the index. Only created where pg_trgm is available
+    """
+    return Index(
+        name, column, postgresql_using='gin', postgresql_ops={column.key: 'gin_trgm_ops'}
+    ).ddl_if(dialect='postgresql', callable_=trigram_available)
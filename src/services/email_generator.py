@@ -3,13 +3,35 @@ Email Generation and Verification Service
 Generates email patterns and verifies email addresses
 """
 
+import atexit
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import dns.resolver
 import smtplib
 import socket
 from typing import List, Dict, Optional, Tuple
 import time
-import random
+from collections import Counter, deque
+from cachelib import SimpleCache
+
+# MX lookups are cached per domain for this many seconds, for up to this many domains
+MX_CACHE_TIMEOUT = 300
+MX_CACHE_SIZE = 4096
+
+# Domains verify_email_addresses checks at once; the addresses of one domain are
+# still checked one after another
+VERIFY_WORKERS = 16
+
+# SMTP checks allowed against one MX host in any one-second window
+SMTP_CHECKS_PER_SECOND = 5
+
+# Patterns used on every generated or verified address, compiled once
+_NON_LETTERS = re.compile(r'[^a-zA-Z]')
+_URL_SCHEME = re.compile(r'^https?://')
+_WWW_PREFIX = re.compile(r'^www\.')
+_EMAIL_FORMAT = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+_DIGIT_RUN = re.compile(r'\d{3,}')
 
 class EmailGenerator:
     def __init__(self):
@@ -30,9 +52,23 @@ class EmailGenerator:
         # Cache for domain patterns
         self.domain_patterns = {}
         
-    def generate_email_patterns(self, first_name: str, last_name: str, domain: str) -> List[str]:
+        # MX hosts by domain, empty when the lookup failed
+        self.mx_hosts = SimpleCache(threshold=MX_CACHE_SIZE, default_timeout=MX_CACHE_TIMEOUT)
+        
+        # Idle SMTP sessions by MX host, reused by the next check against that
+        # host; a session is taken out of the pool while a thread uses it
+        self._smtp_pool = {}
+        self._smtp_lock = threading.Lock()
+        
+        # Start times of the SMTP checks in the last second, by MX host
+        self._smtp_checks = {}
+        atexit.register(self.close_all)
+        
+    def generate_email_patterns(self, first_name: str, last_name: str, domain: str,
+                                limit: Optional[int] = None) -> List[str]:
         """
-        Generate possible email patterns for a person at a company
+        Generate possible email patterns for a person at a company, the domain's
+        known pattern first; stops after limit distinct emails when given
         """
         if not all([first_name, last_name, domain]):
             return []
@@ -45,20 +81,30 @@ class EmailGenerator:
         if not all([first, last, domain]):
             return []
             
-        # Generate variations
-        emails = []
+        # Pattern fields, worked out once for every pattern
+        fields = {
+            'first': first,
+            'last': last,
+            'first_initial': first[0],
+            'last_initial': last[0],
+            'domain': domain
+        }
         
-        # Check if we know the pattern for this domain
+        # The known pattern for this domain, if any, then all common patterns
+        patterns = self.common_patterns
         known_pattern = self.domain_patterns.get(domain)
         if known_pattern:
-            email = self._apply_pattern(known_pattern, first, last, domain)
-            if email:
-                emails.append(email)
+            patterns = [known_pattern, *patterns]
         
-        # Generate all common patterns
-        for pattern in self.common_patterns:
-            email = self._apply_pattern(pattern, first, last, domain)
-            if email and email not in emails:
+        # Generate variations
+        emails = []
+        seen = set()
+        for pattern in patterns:
+            if len(emails) == limit:
+                break
+            email = self._apply_pattern(pattern, fields)
+            if email and email not in seen:
+                seen.add(email)
                 emails.append(email)
                 
         return emails
@@ -69,7 +115,7 @@ class EmailGenerator:
             return ""
             
         # Remove special characters, keep only letters
-        cleaned = re.sub(r'[^a-zA-Z]', '', name.strip())
+        cleaned = _NON_LETTERS.sub('', name.strip())
         return cleaned.lower()
     
     def _clean_domain(self, domain: str) -> str:
@@ -78,27 +124,18 @@ class EmailGenerator:
             return ""
             
         # Remove protocol and www
-        domain = re.sub(r'^https?://', '', domain)
-        domain = re.sub(r'^www\.', '', domain)
+        domain = _URL_SCHEME.sub('', domain)
+        domain = _WWW_PREFIX.sub('', domain)
         
         # Remove path
         domain = domain.split('/')[0]
         
         return domain.lower()
     
-    def _apply_pattern(self, pattern: str, first: str, last: str, domain: str) -> str:
-        """Apply an email pattern to generate an email address"""
+    def _apply_pattern(self, pattern: str, fields: Dict[str, str]) -> str:
+        """Apply an email pattern to the pattern fields to generate an email address"""
         try:
-            first_initial = first[0] if first else ""
-            last_initial = last[0] if last else ""
-            
-            email = pattern.format(
-                first=first,
-                last=last,
-                first_initial=first_initial,
-                last_initial=last_initial,
-                domain=domain
-            )
+            email = pattern.format_map(fields)
             
             # Validate email format
             if self._is_valid_email_format(email):
@@ -111,33 +148,48 @@ class EmailGenerator:
     
     def _is_valid_email_format(self, email: str) -> bool:
         """Check if email has valid format"""
-        pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        return bool(re.match(pattern, email))
+        return bool(_EMAIL_FORMAT.match(email))
     
     def verify_email_addresses(self, emails: List[str]) -> List[Dict[str, any]]:
         """
         Verify a list of email addresses
         Returns list of dicts with email and verification status
         """
-        results = []
+        # Positions of the emails by domain: different domains are verified
+        # concurrently, and the SMTP checks are rate limited per mail server
+        positions_by_domain = {}
+        for position, email in enumerate(emails):
+            positions_by_domain.setdefault(email.rpartition('@')[2].lower(), []).append(position)
         
-        for email in emails:
-            verification = self.verify_single_email(email)
-            results.append({
-                'email': email,
-                'is_valid': verification['is_valid'],
-                'confidence': verification['confidence'],
-                'method': verification['method']
-            })
-            
-            # Rate limiting
-            time.sleep(random.uniform(0.1, 0.3))
+        results = [None] * len(emails)
+        
+        def verify_domain(domain, positions):
+            # The domain's MX hosts, looked up once for all its addresses, on the
+            # first one that is well formed
+            mx_hosts = None
+            for position in positions:
+                email = emails[position]
+                if mx_hosts is None and self._is_valid_email_format(email):
+                    mx_hosts = self._resolve_mx(domain)
+                verification = self.verify_single_email(email, mx_hosts)
+                results[position] = {
+                    'email': email,
+                    'is_valid': verification['is_valid'],
+                    'confidence': verification['confidence'],
+                    'method': verification['method']
+                }
+        
+        if positions_by_domain:
+            with ThreadPoolExecutor(max_workers=min(VERIFY_WORKERS, len(positions_by_domain))) as executor:
+                # list() re-raises any error from the workers
+                list(executor.map(verify_domain, positions_by_domain.keys(), positions_by_domain.values()))
             
         return results
     
-    def verify_single_email(self, email: str) -> Dict[str, any]:
+    def verify_single_email(self, email: str, mx_hosts: Optional[Tuple[str, ...]] = None) -> Dict[str, any]:
         """
         Verify a single email address using multiple methods
+        mx_hosts are the domain's MX hosts when the caller already resolved them
         """
         if not self._is_valid_email_format(email):
             return {
@@ -147,10 +199,11 @@ class EmailGenerator:
             }
         
         domain = email.split('@')[1]
+        if mx_hosts is None:
+            mx_hosts = self._resolve_mx(domain)
         
         # Method 1: DNS MX Record Check
-        mx_valid = self._check_mx_record(domain)
-        if not mx_valid:
+        if not mx_hosts:
             return {
                 'is_valid': False,
                 'confidence': 10,
@@ -158,7 +211,7 @@ class EmailGenerator:
             }
         
         # Method 2: SMTP Check (basic)
-        smtp_result = self._check_smtp_basic(email)
+        smtp_result = self._check_smtp_basic(email, mx_hosts)
         
         # Method 3: Pattern Analysis
         pattern_score = self._analyze_email_pattern(email)
@@ -181,43 +234,126 @@ class EmailGenerator:
             'method': 'combined'
         }
     
+    def _resolve_mx(self, domain: str) -> Tuple[str, ...]:
+        """
+        MX hosts of domain in answer order, () when the lookup fails. Cached, so
+        verifying many addresses at one domain resolves it once
+        """
+        hosts = self.mx_hosts.get(domain)
+        if hosts is None:
+            try:
+                hosts = tuple(str(record.exchange) for record in dns.resolver.resolve(domain, 'MX'))
+            except Exception:
+                hosts = ()
+            self.mx_hosts.set(domain, hosts)
+        return hosts
+    
     def _check_mx_record(self, domain: str) -> bool:
         """Check if domain has MX record"""
+        return bool(self._resolve_mx(domain))
+    
+    def _throttle_smtp(self, mx_host: str):
+        """
+        Rate limiting: wait until fewer than SMTP_CHECKS_PER_SECOND checks
+        against mx_host started in the last second, then count this one. Checks
+        go ahead immediately while the host is under the limit
+        """
+        while True:
+            with self._smtp_lock:
+                recent = self._smtp_checks.setdefault(mx_host, deque())
+                now = time.monotonic()
+                while recent and now - recent[0] >= 1:
+                    recent.popleft()
+                if len(recent) < SMTP_CHECKS_PER_SECOND:
+                    recent.append(now)
+                    return
+                wait = 1 - (now - recent[0])
+            time.sleep(wait)
+    
+    def _get_smtp(self, mx_host: str) -> smtplib.SMTP:
+        """
+        An SMTP session with mx_host for this thread alone: an idle pooled one
+        that still answers NOOP, otherwise a new connection
+        """
+        with self._smtp_lock:
+            idle = self._smtp_pool.get(mx_host)
+            server = idle.pop() if idle else None
+        
+        if server is not None:
+            try:
+                if server.noop()[0] == 250:
+                    return server
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._close_smtp(server)
+        
+        # Connect to SMTP server
+        server = smtplib.SMTP(timeout=10)
         try:
-            mx_records = dns.resolver.resolve(domain, 'MX')
-            return len(mx_records) > 0
+            server.connect(mx_host, 25)
+            server.helo()
         except:
-            return False
+            self._close_smtp(server)
+            raise
+        return server
+    
+    def _release_smtp(self, mx_host: str, server: smtplib.SMTP):
+        """Reset a session after a check and put it back in the pool"""
+        try:
+            server.rset()
+        except (smtplib.SMTPException, OSError):
+            self._close_smtp(server)
+            return
+        with self._smtp_lock:
+            self._smtp_pool.setdefault(mx_host, []).append(server)
+    
+    def _close_smtp(self, server: smtplib.SMTP):
+        """Drop a session without waiting on the server"""
+        try:
+            server.close()
+        except OSError:
+            pass
     
-    def _check_smtp_basic(self, email: str) -> Dict[str, bool]:
+    def close_all(self):
+        """QUIT and close every pooled SMTP session"""
+        with self._smtp_lock:
+            sessions = [server for idle in self._smtp_pool.values() for server in idle]
+            self._smtp_pool.clear()
+        for server in sessions:
+            try:
+                server.quit()
+            except (smtplib.SMTPException, OSError):
+                self._close_smtp(server)
+    
+    def _check_smtp_basic(self, email: str, mx_hosts: Tuple[str, ...]) -> Dict[str, bool]:
         """
-        Basic SMTP check (without actually sending)
+        Basic SMTP check (without actually sending), on a pooled session with
+        the first of the domain's mail servers, mx_hosts
         """
-        domain = email.split('@')[1]
+        if not mx_hosts:
+            return {'deliverable': False, 'unknown': True}
+        mx_record = mx_hosts[0]
+        self._throttle_smtp(mx_record)
+        
+        try:
+            server = self._get_smtp(mx_record)
+        except:
+            return {'deliverable': False, 'unknown': True}
         
         try:
-            # Get MX record
-            mx_records = dns.resolver.resolve(domain, 'MX')
-            mx_record = str(mx_records[0].exchange)
-            
-            # Connect to SMTP server
-            server = smtplib.SMTP(timeout=10)
-            server.connect(mx_record, 25)
-            server.helo()
-            
             # Check if email exists (some servers respond)
             code, message = server.rcpt(email)
-            server.quit()
-            
-            if code == 250:
-                return {'deliverable': True, 'unknown': False}
-            elif code in [450, 451, 452]:
-                return {'deliverable': False, 'unknown': True}
-            else:
-                return {'deliverable': False, 'unknown': False}
-                
         except:
+            self._close_smtp(server)
+            return {'deliverable': False, 'unknown': True}
+        self._release_smtp(mx_record, server)
+        
+        if code == 250:
+            return {'deliverable': True, 'unknown': False}
+        elif code in [450, 451, 452]:
             return {'deliverable': False, 'unknown': True}
+        else:
+            return {'deliverable': False, 'unknown': False}
     
     def _analyze_email_pattern(self, email: str) -> int:
         """
@@ -234,7 +370,7 @@ class EmailGenerator:
             score += 10  # Reasonable length
             
         # Avoid obvious fake patterns
-        if re.search(r'\d{3,}', local_part):
+        if _DIGIT_RUN.search(local_part):
             score -= 20  # Too many numbers
             
         if local_part in ['info', 'contact', 'admin', 'support']:
@@ -249,30 +385,30 @@ class EmailGenerator:
         if not known_emails:
             return None
             
-        patterns = {}
+        patterns = Counter()
         
         for email in known_emails:
             if not email or '@' not in email:
                 continue
                 
-            local_part = email.split('@')[0]
+            # The dot-separated parts of the local part
+            parts = email.split('@')[0].split('.')
             
             # Try to identify the pattern
-            if '.' in local_part and len(local_part.split('.')) == 2:
-                parts = local_part.split('.')
+            if len(parts) == 2:
                 if len(parts[0]) > 1 and len(parts[1]) > 1:
-                    patterns['{first}.{last}@{domain}'] = patterns.get('{first}.{last}@{domain}', 0) + 1
+                    patterns['{first}.{last}@{domain}'] += 1
                 elif len(parts[0]) == 1:
-                    patterns['{first_initial}.{last}@{domain}'] = patterns.get('{first_initial}.{last}@{domain}', 0) + 1
+                    patterns['{first_initial}.{last}@{domain}'] += 1
                 elif len(parts[1]) == 1:
-                    patterns['{first}.{last_initial}@{domain}'] = patterns.get('{first}.{last_initial}@{domain}', 0) + 1
+                    patterns['{first}.{last_initial}@{domain}'] += 1
             
-            elif len(local_part) > 3 and not '.' in local_part:
-                patterns['{first}{last}@{domain}'] = patterns.get('{first}{last}@{domain}', 0) + 1
+            elif len(parts) == 1 and len(parts[0]) > 3:
+                patterns['{first}{last}@{domain}'] += 1
         
-        # Return most common pattern
+        # Return most common pattern (the first one found on a tie)
         if patterns:
-            most_common = max(patterns, key=patterns.get)
+            most_common = patterns.most_common(1)[0][0]
             self.domain_patterns[domain] = most_common
             return most_common
             
@@ -283,25 +419,22 @@ class EmailGenerator:
         """
         Generate email patterns and verify them, returning best candidates
         """
-        # Generate possible emails
-        possible_emails = self.generate_email_patterns(first_name, last_name, domain)
+        # Generate possible emails, no more than there are attempts
+        emails_to_check = self.generate_email_patterns(first_name, last_name, domain, limit=max_attempts)
         
-        if not possible_emails:
+        if not emails_to_check:
             return []
         
-        # Limit attempts
-        emails_to_check = possible_emails[:max_attempts]
-        
         # Verify emails
-        verified_emails = self.verify_email_addresses(emails_to_check)
-        
+        return self._likely_valid(self.verify_email_addresses(emails_to_check))
+    
+    def _likely_valid(self, verified_emails: List[Dict[str, any]]) -> List[Dict[str, any]]:
+        """Verification results of likely valid emails, best first"""
         # Sort by confidence
         verified_emails.sort(key=lambda x: x['confidence'], reverse=True)
         
         # Return only likely valid emails
-        valid_emails = [e for e in verified_emails if e['confidence'] >= 50]
-        
-        return valid_emails
+        return [e for e in verified_emails if e['confidence'] >= 50]
     
     def extract_domain_from_website(self, website: str) -> str:
         """Extract email domain from website URL"""
@@ -328,10 +461,25 @@ class EmailGenerator:
         if known_emails:
             self.find_company_email_pattern(known_emails, company_domain)
         
-        for contact in contacts:
-            first_name = contact.get('first_name', '')
-            last_name = contact.get('last_name', '')
-            
+        # Look up the domain's mail servers once for the batch: without MX records
+        # no generated address can verify, so none are generated or checked
+        domain_has_mx = (
+            len(known_emails) < len(contacts) and self._check_mx_record(self._clean_domain(company_domain))
+        )
+        
+        # Candidate addresses of every contact without an email, by position,
+        # verified as one batch: the domain is resolved and its checks queued once
+        # for the company rather than once per contact
+        candidates = {}
+        if domain_has_mx:
+            for position, contact in enumerate(contacts):
+                if not contact.get('email'):
+                    candidates[position] = self.generate_email_patterns(
+                        contact.get('first_name', ''), contact.get('last_name', ''), company_domain, limit=3
+                    )
+        verified = iter(self.verify_email_addresses([email for emails in candidates.values() for email in emails]))
+        
+        for position, contact in enumerate(contacts):
             # Skip if we already have an email
             if contact.get('email'):
                 results.append({
@@ -341,10 +489,8 @@ class EmailGenerator:
                 })
                 continue
             
-            # Generate and verify emails
-            generated_emails = self.generate_and_verify_emails(
-                first_name, last_name, company_domain, max_attempts=3
-            )
+            # This contact's share of the verified candidates
+            generated_emails = self._likely_valid([next(verified) for _ in candidates.get(position, ())])
             
             # Use best email if available
             best_email = None
@@ -5,11 +5,87 @@ Handles real lead generation using web scraping and email generation
 
 import requests
 import random
-from typing import List, Dict, Optional
+import re
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import List, Dict, Optional, Tuple
 from datetime import datetime
 from .web_scraper import WebScraper
 from .email_generator import EmailGenerator
 
+# Companies generate_leads_by_industry scrapes and enriches at once; each one is
+# a few page fetches plus email verification, almost all of it network waits
+ENRICH_WORKERS = 8
+
+# Business roles of the contacts guessed for a company where none were found,
+# as (job title, first names to pick from), and the last names to pick from
+LIKELY_CONTACT_ROLES = (
+    ('CEO', ('John', 'Jane', 'Michael', 'Sarah', 'David')),
+    ('CTO', ('Alex', 'Chris', 'Jordan', 'Taylor', 'Morgan')),
+    ('VP Sales', ('Robert', 'Lisa', 'Mark', 'Jennifer', 'Brian')),
+    ('VP Marketing', ('Emily', 'Daniel', 'Michelle', 'Kevin', 'Amanda')),
+)
+LIKELY_LAST_NAMES = ('Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis')
+
+# Company sizes to estimate from, and the employee count range of each
+COMPANY_SIZES = ('1-10', '10-50', '50-100', '100-500', '500+')
+EMPLOYEE_RANGES = {
+    '1-10': (1, 10),
+    '10-50': (10, 50),
+    '50-100': (50, 100),
+    '100-500': (100, 500),
+    '500+': (500, 1000)
+}
+
+# Mock company names: an industry-specific prefix (generic ones for other
+# industries) and a suffix
+MOCK_NAME_PREFIXES = {
+    'technology': ('Tech', 'Soft', 'Data', 'Cloud', 'AI', 'Digital'),
+    'marketing': ('Marketing', 'Brand', 'Creative', 'Media', 'Growth'),
+    'healthcare': ('Health', 'Medical', 'Care', 'Wellness', 'Bio'),
+    'finance': ('Financial', 'Capital', 'Investment', 'Bank', 'Fund'),
+    'retail': ('Retail', 'Store', 'Shop', 'Market', 'Commerce')
+}
+MOCK_DEFAULT_PREFIXES = ('Business', 'Company')
+MOCK_NAME_SUFFIXES = ('Solutions', 'Systems', 'Group', 'Corp', 'Inc', 'LLC', 'Partners')
+
+# Department and seniority keyword buckets as (keywords, label), checked in
+# order: the first bucket with a keyword contained in the lowercased job title
+# gives the label
+DEPARTMENT_KEYWORDS = (
+    (('ceo', 'president', 'founder'), 'Executive'),
+    (('cto', 'engineering', 'technical', 'developer'), 'Engineering'),
+    (('sales', 'business development'), 'Sales'),
+    (('marketing', 'growth', 'brand'), 'Marketing'),
+    (('finance', 'accounting', 'cfo'), 'Finance'),
+)
+SENIORITY_KEYWORDS = (
+    (('ceo', 'cto', 'cfo', 'coo', 'chief'), 'C-Level'),
+    (('vp', 'vice president'), 'VP'),
+    (('director', 'head'), 'Director'),
+    (('manager', 'lead'), 'Manager'),
+)
+
+# Every keyword of both, found in one scan of the title, overlapping occurrences
+# included ('director' contains 'cto'). One keyword is captured per position,
+# longest first; none is a prefix of another, so none is missed
+_TITLE_KEYWORDS = re.compile('(?=({}))'.format('|'.join(
+    map(re.escape, sorted(
+        {keyword for buckets in (DEPARTMENT_KEYWORDS, SENIORITY_KEYWORDS) for keywords, _ in buckets for keyword in keywords},
+        key=len, reverse=True
+    ))
+)))
+
+# Job titles repeat heavily across scraped contacts ("CEO", "VP Sales"...), so
+# classifications are memoized (bounded to keep memory flat)
+@lru_cache(maxsize=4096)
+def _classify_title(job_title: str) -> Tuple[str, str]:
+    """(department, seniority level) of a job title"""
+    found = set(_TITLE_KEYWORDS.findall(job_title.lower()))
+    department = next((label for keywords, label in DEPARTMENT_KEYWORDS if found.intersection(keywords)), 'Other')
+    seniority = next((label for keywords, label in SENIORITY_KEYWORDS if found.intersection(keywords)), 'Individual Contributor')
+    return department, seniority
+
 class LeadGenerationService:
     def __init__(self):
         self.web_scraper = WebScraper()
@@ -29,14 +105,15 @@ class LeadGenerationService:
             # Fall back to mock data for testing
             companies = self._generate_mock_companies(industry, location, company_size, limit)
         
-        # Enrich companies with contacts and emails
+        # Enrich companies with contacts and emails, several companies at a time;
+        # map() keeps them in the order they were found
         enriched_companies = []
-        all_contacts = []
+        if companies:
+            with ThreadPoolExecutor(max_workers=min(ENRICH_WORKERS, len(companies))) as executor:
+                enriched_companies = list(executor.map(self._enrich_company_with_contacts, companies))
         
-        for company in companies:
-            enriched_company = self._enrich_company_with_contacts(company)
-            enriched_companies.append(enriched_company)
-            
+        all_contacts = []
+        for company, enriched_company in zip(companies, enriched_companies):
             # Add contacts to the all_contacts list
             for contact in enriched_company.get('contacts', []):
                 contact['company_name'] = company.get('name', '')
@@ -87,15 +164,13 @@ class LeadGenerationService:
         enhanced = company.copy()
         
         # Add missing fields
-        enhanced.update({
-            'industry': industry,
-            'company_size': company_size or self._estimate_company_size(),
-            'founded_year': random.randint(2010, 2023),
-            'funding_status': random.choice(['Seed', 'Series A', 'Series B', 'Bootstrapped', 'Unknown']),
-            'employee_count': self._estimate_employee_count(company_size),
-            'description': enhanced.get('description', f"Company in {industry} industry"),
-            'location_country': 'United States',  # Default for now
-        })
+        enhanced['industry'] = industry
+        enhanced['company_size'] = company_size or self._estimate_company_size()
+        enhanced['founded_year'] = random.randint(2010, 2023)
+        enhanced['funding_status'] = random.choice(['Seed', 'Series A', 'Series B', 'Bootstrapped', 'Unknown'])
+        enhanced['employee_count'] = self._estimate_employee_count(company_size)
+        enhanced['description'] = enhanced.get('description', f"Company in {industry} industry")
+        enhanced['location_country'] = 'United States'  # Default for now
         
         # Extract domain from website
         if enhanced.get('website'):
@@ -147,14 +222,12 @@ class LeadGenerationService:
         enhanced = contact.copy()
         
         # Add company information
-        enhanced.update({
-            'company_name': company.get('name', ''),
-            'company_domain': company.get('domain', ''),
-            'company_industry': company.get('industry', ''),
-            'location_country': company.get('location_country', 'United States'),
-            'location_state': company.get('location_state', ''),
-            'location_city': company.get('location_city', ''),
-        })
+        enhanced['company_name'] = company.get('name', '')
+        enhanced['company_domain'] = company.get('domain', '')
+        enhanced['company_industry'] = company.get('industry', '')
+        enhanced['location_country'] = company.get('location_country', 'United States')
+        enhanced['location_state'] = company.get('location_state', '')
+        enhanced['location_city'] = company.get('location_city', '')
         
         # Parse name if not already split
         if enhanced.get('name') and not enhanced.get('first_name'):
@@ -165,8 +238,7 @@ class LeadGenerationService:
         # Determine department and seniority from job title
         job_title = enhanced.get('job_title', '')
         if job_title:
-            enhanced['department'] = self._get_department_from_title(job_title)
-            enhanced['seniority_level'] = self._get_seniority_from_title(job_title)
+            enhanced['department'], enhanced['seniority_level'] = _classify_title(job_title)
         
         # Calculate lead score
         enhanced['lead_score'] = self._calculate_lead_score(enhanced)
@@ -176,26 +248,17 @@ class LeadGenerationService:
     def _generate_likely_contacts(self, company: Dict, domain: str) -> List[Dict]:
         """Generate likely contacts based on common business roles"""
         
-        common_roles = [
-            {'title': 'CEO', 'first_names': ['John', 'Jane', 'Michael', 'Sarah', 'David']},
-            {'title': 'CTO', 'first_names': ['Alex', 'Chris', 'Jordan', 'Taylor', 'Morgan']},
-            {'title': 'VP Sales', 'first_names': ['Robert', 'Lisa', 'Mark', 'Jennifer', 'Brian']},
-            {'title': 'VP Marketing', 'first_names': ['Emily', 'Daniel', 'Michelle', 'Kevin', 'Amanda']},
-        ]
-        
-        last_names = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis']
-        
         contacts = []
         
-        for role in common_roles[:2]:  # Limit to 2 contacts
-            first_name = random.choice(role['first_names'])
-            last_name = random.choice(last_names)
+        for title, first_names in LIKELY_CONTACT_ROLES[:2]:  # Limit to 2 contacts
+            first_name = random.choice(first_names)
+            last_name = random.choice(LIKELY_LAST_NAMES)
             
             contact = {
                 'first_name': first_name,
                 'last_name': last_name,
                 'name': f"{first_name} {last_name}",
-                'job_title': role['title'],
+                'job_title': title,
                 'company_name': company.get('name', ''),
                 'source': 'Generated Pattern'
             }
@@ -206,20 +269,12 @@ class LeadGenerationService:
     
     def _estimate_company_size(self) -> str:
         """Estimate company size"""
-        return random.choice(['1-10', '10-50', '50-100', '100-500', '500+'])
+        return random.choice(COMPANY_SIZES)
     
     def _estimate_employee_count(self, company_size: str) -> int:
         """Estimate employee count from company size"""
-        size_ranges = {
-            '1-10': (1, 10),
-            '10-50': (10, 50),
-            '50-100': (50, 100),
-            '100-500': (100, 500),
-            '500+': (500, 1000)
-        }
-        
-        if company_size in size_ranges:
-            min_size, max_size = size_ranges[company_size]
+        if company_size in EMPLOYEE_RANGES:
+            min_size, max_size = EMPLOYEE_RANGES[company_size]
             return random.randint(min_size, max_size)
         
         return random.randint(10, 100)
@@ -228,24 +283,14 @@ class LeadGenerationService:
                                company_size: str, limit: int) -> List[Dict]:
         """Generate mock companies for demonstration (fallback)"""
         
-        # Industry-specific company name patterns
-        industry_patterns = {
-            'technology': ['Tech', 'Soft', 'Data', 'Cloud', 'AI', 'Digital'],
-            'marketing': ['Marketing', 'Brand', 'Creative', 'Media', 'Growth'],
-            'healthcare': ['Health', 'Medical', 'Care', 'Wellness', 'Bio'],
-            'finance': ['Financial', 'Capital', 'Investment', 'Bank', 'Fund'],
-            'retail': ['Retail', 'Store', 'Shop', 'Market', 'Commerce']
-        }
-        
-        suffixes = ['Solutions', 'Systems', 'Group', 'Corp', 'Inc', 'LLC', 'Partners']
-        
         companies = []
-        patterns = industry_patterns.get(industry.lower(), ['Business', 'Company'])
+        industry_lower = industry.lower()
+        patterns = MOCK_NAME_PREFIXES.get(industry_lower, MOCK_DEFAULT_PREFIXES)
         
         for i in range(min(limit, 10)):  # Limit mock data
             # Generate company name
             prefix = random.choice(patterns)
-            suffix = random.choice(suffixes)
+            suffix = random.choice(MOCK_NAME_SUFFIXES)
             company_name = f"{prefix}{suffix} {random.randint(100, 999)}"
             
             # Generate mock company data
@@ -258,7 +303,7 @@ class LeadGenerationService:
                 'location_country': 'United States',
                 'location_state': location.split(',')[1].strip() if ',' in location else 'California',
                 'location_city': location.split(',')[0].strip() if ',' in location else 'San Francisco',
-                'description': f"Leading {industry.lower()} company providing innovative solutions",
+                'description': f"Leading {industry_lower} company providing innovative solutions",
                 'founded_year': random.randint(2010, 2023),
                 'funding_status': random.choice(['Seed', 'Series A', 'Series B', 'Bootstrapped']),
                 'employee_count': random.randint(10, 500),
@@ -269,38 +314,6 @@ class LeadGenerationService:
         
         return companies
     
-    def _get_department_from_title(self, job_title: str) -> str:
-        """Determine department from job title"""
-        title_lower = job_title.lower()
-        
-        if any(word in title_lower for word in ['ceo', 'president', 'founder']):
-            return 'Executive'
-        elif any(word in title_lower for word in ['cto', 'engineering', 'technical', 'developer']):
-            return 'Engineering'
-        elif any(word in title_lower for word in ['sales', 'business development']):
-            return 'Sales'
-        elif any(word in title_lower for word in ['marketing', 'growth', 'brand']):
-            return 'Marketing'
-        elif any(word in title_lower for word in ['finance', 'accounting', 'cfo']):
-            return 'Finance'
-        else:
-            return 'Other'
-    
-    def _get_seniority_from_title(self, job_title: str) -> str:
-        """Determine seniority level from job title"""
-        title_lower = job_title.lower()
-        
-        if any(word in title_lower for word in ['ceo', 'cto', 'cfo', 'coo', 'chief']):
-            return 'C-Level'
-        elif any(word in title_lower for word in ['vp', 'vice president']):
-            return 'VP'
-        elif any(word in title_lower for word in ['director', 'head']):
-            return 'Director'
-        elif any(word in title_lower for word in ['manager', 'lead']):
-            return 'Manager'
-        else:
-            return 'Individual Contributor'
-    
     def _calculate_lead_score(self, contact: Dict) -> int:
         """Calculate lead score based on available data"""
         score = 0
@@ -328,9 +341,8 @@ class LeadGenerationService:
         elif 'Manager' in seniority:
             score += 10
         
-        # Job title relevance
-        job_title = contact.get('job_title', '').lower()
-        if any(word in job_title for word in ['ceo', 'founder', 'president']):
+        # Job title relevance: an executive title (CEO, founder, president)
+        if _classify_title(contact.get('job_title', ''))[0] == 'Executive':
             score += 10
         
         # Email confidence (if generated)
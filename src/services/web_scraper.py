@@ -3,37 +3,202 @@ Web Scraping Service for Lead Generation
 Scrapes public data sources to find companies and contacts
 """
 
+import atexit
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup, NavigableString, SoupStrainer
+from cachelib import SimpleCache
 import re
 import time
 import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from urllib.parse import urljoin, urlparse
 import json
 from typing import List, Dict, Optional
 
+# Hosts the session keeps idle keep-alive connections for (requests keeps 10):
+# searches and company enrichment run concurrently across more sites than that,
+# and a host whose pool was dropped pays the TCP and TLS handshakes again
+HTTP_POOL_HOSTS = 64
+
+# Connections kept per host, enough for every thread of a search or enrichment
+HTTP_POOL_SIZE = 16
+
+# Requests in flight to any one host: searches, directory scrapes and contact
+# page fetches run concurrently, and concurrent lead generation runs hit the
+# same search sites
+HOST_CONCURRENCY = 10
+
+# Request rate per host, as a token bucket: a burst of up to HOST_REQUEST_BURST
+# requests (the seven pages of a company scrape go out at once), then one every
+# 2s, so concurrent runs keep the search and directory sites at the pace of the
+# old fixed pauses
+HOST_REQUEST_BURST = 7
+HOST_REQUESTS_PER_SECOND = 0.5
+
+# Retries of a request the host answered with "too many requests" or a
+# temporary failure, after 1, 2, 4 and 8 seconds (plus up to 1s of jitter)
+HTTP_RETRIES = 4
+RETRY_STATUSES = {429, 502, 503, 504}
+
+# BeautifulSoup tree builder for fetched pages: lxml's C parser rather than the
+# pure-Python html.parser
+HTML_PARSER = 'lxml'
+
+# The parts of search and directory pages their companies are read from: only
+# these are built into a tree, the rest of the page is skipped while parsing
+YELLOW_PAGES_LISTINGS = SoupStrainer('div', class_='result')
+GOOGLE_RESULTS = SoupStrainer('div', class_='g')
+DIRECTORY_LINKS = SoupStrainer('a', href=True)
+
+# The elements of a Yellow Pages listing its company details are read from, by
+# tag and class
+YP_LISTING_ELEMENTS = {
+    ('a', 'business-name'),
+    ('div', 'street-address'),
+    ('div', 'phones'),
+    ('a', 'track-visit-website')
+}
+
+# Industry-specific directory URLs, by lowercased industry
+INDUSTRY_DIRECTORIES = {
+    'technology': [
+        'https://www.crunchbase.com',
+        'https://angel.co',
+        'https://www.inc.com/inc5000'
+    ],
+    'marketing': [
+        'https://clutch.co/agencies',
+        'https://www.agencyspotter.com'
+    ],
+    'healthcare': [
+        'https://www.healthgrades.com',
+        'https://www.medicare.gov'
+    ]
+}
+
+# Free mail providers: addresses at these domains are not business contacts
+FREE_EMAIL_DOMAINS = frozenset((
+    'gmail.com', 'yahoo.com', 'hotmail.com', 'outlook.com',
+    'aol.com', 'icloud.com', 'protonmail.com'
+))
+
+# Patterns used on every scraped page and every address found, compiled once
+_EMAIL_ADDRESS = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+_FULL_NAME = re.compile(r'\b([A-Z][a-z]+ [A-Z][a-z]+)\b')
+_LINKEDIN_PROFILE_HREF = re.compile(r'linkedin\.com/in/')
+_LINKEDIN_PROFILE_SLUG = re.compile(r'/in/([^/]+)')
+
+# Common job title patterns, tried in this order
+_JOB_TITLES = tuple(re.compile(pattern, re.IGNORECASE) for pattern in (
+    r'\b(CEO|CTO|CFO|COO|VP|Vice President|President|Director|Manager|Lead|Head)\b',
+    r'\b(Chief Executive Officer|Chief Technology Officer|Chief Financial Officer)\b',
+    r'\b(Senior|Principal|Associate|Assistant)\s+\w+\b'
+))
+
+# Seconds and number of websites the contacts found on a company website are
+# kept for: repeated lead generation runs with overlapping searches find the
+# same companies, and scraping one site takes several page fetches and pauses
+CONTACTS_CACHE_TIMEOUT = 3600
+CONTACTS_CACHE_SIZE = 10000
+
+# The same addresses and LinkedIn profiles turn up on several pages of a company
+# website (homepage, /about, /team...), so both checks are memoized (bounded to
+# keep memory flat)
+@lru_cache(maxsize=4096)
+def _is_valid_business_email(email: str) -> bool:
+    """Check if email looks like a business email"""
+    # Skip common non-business domains
+    domain = email.rpartition('@')[2].lower()
+    return domain not in FREE_EMAIL_DOMAINS
+
+@lru_cache(maxsize=4096)
+def _extract_name_from_linkedin_url(linkedin_url: str) -> str:
+    """Extract name from LinkedIn URL"""
+    # LinkedIn URLs often contain the person's name
+    # e.g., linkedin.com/in/john-smith-123456
+    match = _LINKEDIN_PROFILE_SLUG.search(linkedin_url)
+    if match:
+        name_slug = match.group(1)
+        # Convert slug to name
+        name_parts = name_slug.split('-')
+        if len(name_parts) >= 2:
+            first_name = name_parts[0].capitalize()
+            last_name = name_parts[1].capitalize()
+            return f"{first_name} {last_name}"
+            
+    return ""
+
 class WebScraper:
     def __init__(self):
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         })
+        adapter = HTTPAdapter(pool_connections=HTTP_POOL_HOSTS, pool_maxsize=HTTP_POOL_SIZE)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        atexit.register(self.session.close)
         
-    def search_companies_by_industry(self, industry: str, location: str = "", limit: int = 50) -> List[Dict]:
+        # Limits on the requests in flight, and (tokens left, time counted) of the
+        # request rate buckets, by host
+        self.host_semaphores = {}
+        self.host_tokens = {}
+        self.hosts_lock = threading.Lock()
+        
+        # Contacts found on a company website, by website
+        self.contacts_by_website = SimpleCache(threshold=CONTACTS_CACHE_SIZE, default_timeout=CONTACTS_CACHE_TIMEOUT)
+        
+    def _get(self, url: str) -> requests.Response:
         """
-        Search for companies by industry using multiple free sources
+        GET a page through the shared session, at most HOST_CONCURRENCY requests
+        at a time and at HOST_REQUESTS_PER_SECOND (after a burst) per host,
+        backing off and retrying when the host asks to
         """
-        companies = []
+        host = urlparse(url).netloc
+        with self.hosts_lock:
+            semaphore = self.host_semaphores.setdefault(host, threading.BoundedSemaphore(HOST_CONCURRENCY))
         
-        # Search Yellow Pages
-        companies.extend(self._search_yellow_pages(industry, location, limit // 3))
+        for attempt in range(HTTP_RETRIES + 1):
+            with semaphore:
+                self._throttle(host)
+                response = self.session.get(url, timeout=10)
+            if response.status_code not in RETRY_STATUSES or attempt == HTTP_RETRIES:
+                return response
+            time.sleep(2 ** attempt + random.random())
         
-        # Search Google My Business (via Google search)
-        companies.extend(self._search_google_business(industry, location, limit // 3))
+    def _throttle(self, host: str):
+        """
+        Rate limiting: take a token from host's bucket, which holds up to
+        HOST_REQUEST_BURST and refills at HOST_REQUESTS_PER_SECOND, waiting for
+        one when it is empty. Requests go ahead immediately while tokens are left
+        """
+        while True:
+            with self.hosts_lock:
+                now = time.monotonic()
+                tokens, counted = self.host_tokens.get(host, (HOST_REQUEST_BURST, now))
+                tokens = min(HOST_REQUEST_BURST, tokens + (now - counted) * HOST_REQUESTS_PER_SECOND)
+                if tokens >= 1:
+                    self.host_tokens[host] = (tokens - 1, now)
+                    return
+                self.host_tokens[host] = (tokens, now)
+                wait = (1 - tokens) / HOST_REQUESTS_PER_SECOND
+            time.sleep(wait)
         
-        # Search industry directories
-        companies.extend(self._search_industry_directories(industry, location, limit // 3))
+    def search_companies_by_industry(self, industry: str, location: str = "", limit: int = 50) -> List[Dict]:
+        """
+        Search for companies by industry using multiple free sources
+        """
+        # Yellow Pages, Google My Business (via Google search) and industry
+        # directories: different sites, each rate limited on its own, so they
+        # are searched at the same time and their results joined in this order
+        searches = (self._search_yellow_pages, self._search_google_business, self._search_industry_directories)
+        with ThreadPoolExecutor(max_workers=len(searches)) as executor:
+            results = list(executor.map(lambda search: search(industry, location, limit // 3), searches))
         
+        companies = [company for result in results for company in result]
         return companies[:limit]
     
     def _search_yellow_pages(self, industry: str, location: str, limit: int) -> List[Dict]:
@@ -44,9 +209,9 @@ class WebScraper:
             search_term = f"{industry} {location}".strip()
             url = f"https://www.yellowpages.com/search?search_terms={search_term}&geo_location_terms={location}"
             
-            response = self.session.get(url, timeout=10)
+            response = self._get(url)
             if response.status_code == 200:
-                soup = BeautifulSoup(response.content, 'html.parser')
+                soup = BeautifulSoup(response.content, HTML_PARSER, parse_only=YELLOW_PAGES_LISTINGS)
                 
                 # Extract business listings
                 listings = soup.find_all('div', class_='result')[:limit]
@@ -55,8 +220,6 @@ class WebScraper:
                     company = self._extract_company_from_yp_listing(listing)
                     if company:
                         companies.append(company)
-                        
-            time.sleep(random.uniform(1, 3))  # Rate limiting
             
         except Exception as e:
             print(f"Error searching Yellow Pages: {e}")
@@ -71,9 +234,9 @@ class WebScraper:
             search_query = f"{industry} companies {location} site:linkedin.com/company OR site:crunchbase.com"
             url = f"https://www.google.com/search?q={search_query}"
             
-            response = self.session.get(url, timeout=10)
+            response = self._get(url)
             if response.status_code == 200:
-                soup = BeautifulSoup(response.content, 'html.parser')
+                soup = BeautifulSoup(response.content, HTML_PARSER, parse_only=GOOGLE_RESULTS)
                 
                 # Extract search results
                 results = soup.find_all('div', class_='g')[:limit]
@@ -82,8 +245,6 @@ class WebScraper:
                     company = self._extract_company_from_google_result(result)
                     if company:
                         companies.append(company)
-                        
-            time.sleep(random.uniform(2, 4))  # Rate limiting
             
         except Exception as e:
             print(f"Error searching Google: {e}")
@@ -94,50 +255,50 @@ class WebScraper:
         """Search industry-specific directories"""
         companies = []
         
-        # Industry-specific directory URLs
-        directories = {
-            'technology': [
-                'https://www.crunchbase.com',
-                'https://angel.co',
-                'https://www.inc.com/inc5000'
-            ],
-            'marketing': [
-                'https://clutch.co/agencies',
-                'https://www.agencyspotter.com'
-            ],
-            'healthcare': [
-                'https://www.healthgrades.com',
-                'https://www.medicare.gov'
-            ]
-        }
-        
-        industry_lower = industry.lower()
-        if industry_lower in directories:
-            for directory_url in directories[industry_lower]:
+        directory_urls = INDUSTRY_DIRECTORIES.get(industry.lower())
+        if directory_urls:
+            # The limit is shared evenly between the directories
+            directory_limit = limit // len(directory_urls)
+            
+            def scrape(directory_url):
                 try:
-                    companies.extend(self._scrape_directory(directory_url, industry, location, limit // len(directories[industry_lower])))
+                    return self._scrape_directory(directory_url, industry, location, directory_limit)
                 except Exception as e:
                     print(f"Error scraping {directory_url}: {e}")
+                    return []
+            
+            # One site per directory: scrape them all at once
+            with ThreadPoolExecutor(max_workers=len(directory_urls)) as executor:
+                for directory_companies in executor.map(scrape, directory_urls):
+                    companies.extend(directory_companies)
                     
         return companies
     
     def _extract_company_from_yp_listing(self, listing) -> Optional[Dict]:
         """Extract company information from Yellow Pages listing"""
         try:
-            name_elem = listing.find('a', class_='business-name')
+            # The first element of each kind, found in one walk over the listing
+            elems = {}
+            for elem in listing.find_all(True):
+                for css_class in elem.get('class', ()):
+                    key = (elem.name, css_class)
+                    if key in YP_LISTING_ELEMENTS and key not in elems:
+                        elems[key] = elem
+            
+            name_elem = elems.get(('a', 'business-name'))
             name = name_elem.text.strip() if name_elem else None
             
             if not name:
                 return None
                 
             # Extract other details
-            address_elem = listing.find('div', class_='street-address')
+            address_elem = elems.get(('div', 'street-address'))
             address = address_elem.text.strip() if address_elem else ""
             
-            phone_elem = listing.find('div', class_='phones')
+            phone_elem = elems.get(('div', 'phones'))
             phone = phone_elem.text.strip() if phone_elem else ""
             
-            website_elem = listing.find('a', class_='track-visit-website')
+            website_elem = elems.get(('a', 'track-visit-website'))
             website = website_elem.get('href') if website_elem else ""
             
             return {
@@ -188,9 +349,9 @@ class WebScraper:
         # This is a simplified implementation
         # In practice, each directory would need specific scraping logic
         try:
-            response = self.session.get(directory_url, timeout=10)
+            response = self._get(directory_url)
             if response.status_code == 200:
-                soup = BeautifulSoup(response.content, 'html.parser')
+                soup = BeautifulSoup(response.content, HTML_PARSER, parse_only=DIRECTORY_LINKS)
                 
                 # Generic company extraction (would be customized per directory)
                 company_links = soup.find_all('a', href=True)[:limit]
@@ -204,8 +365,6 @@ class WebScraper:
                                 'website': link.get('href'),
                                 'source': directory_url
                             })
-                            
-            time.sleep(random.uniform(1, 2))
             
         except Exception as e:
             print(f"Error scraping directory {directory_url}: {e}")
@@ -214,13 +373,30 @@ class WebScraper:
     
     def find_company_contacts(self, company_website: str) -> List[Dict]:
         """
-        Find contacts on a company website
+        Find contacts on a company website. Cached by website; the cache hands
+        out copies, so callers may change the contacts they get
+        """
+        if not company_website:
+            return []
+        
+        contacts = self.contacts_by_website.get(company_website)
+        if contacts is None:
+            contacts = self._scrape_company_contacts(company_website)
+            # A scrape in which no page came back (site down, timeouts, still
+            # throttled after retries) is not cached, so the next run tries again
+            if contacts is None:
+                return []
+            self.contacts_by_website.set(company_website, contacts)
+        return contacts
+    
+    def _scrape_company_contacts(self, company_website: str) -> Optional[List[Dict]]:
+        """
+        Scrape the common contact pages of a company website for contacts, or
+        None when none of the pages came back with a 200
         """
         contacts = []
+        fetched = False
         
-        if not company_website:
-            return contacts
-            
         try:
             # Common contact pages
             contact_pages = [
@@ -233,24 +409,31 @@ class WebScraper:
                 '/staff'
             ]
             
-            for page in contact_pages:
-                url = urljoin(company_website, page)
+            def scrape(url):
                 try:
-                    response = self.session.get(url, timeout=10)
+                    response = self._get(url)
                     if response.status_code == 200:
-                        soup = BeautifulSoup(response.content, 'html.parser')
-                        page_contacts = self._extract_contacts_from_page(soup, company_website)
-                        contacts.extend(page_contacts)
-                        
-                    time.sleep(random.uniform(0.5, 1.5))
-                    
+                        soup = BeautifulSoup(response.content, HTML_PARSER)
+                        return self._extract_contacts_from_page(soup, company_website)
                 except Exception as e:
                     print(f"Error scraping {url}: {e}")
-                    continue
+                return None
+            
+            # The pages are fetched at once, rather than one after another with a
+            # pause in between, and their contacts joined in page order
+            urls = [urljoin(company_website, page) for page in contact_pages]
+            with ThreadPoolExecutor(max_workers=len(urls)) as executor:
+                for page_contacts in executor.map(scrape, urls):
+                    if page_contacts is not None:
+                        fetched = True
+                        contacts.extend(page_contacts)
                     
         except Exception as e:
             print(f"Error finding contacts for {company_website}: {e}")
             
+        if not fetched:
+            return None
+            
         # Remove duplicates
         unique_contacts = []
         seen_emails = set()
@@ -267,16 +450,35 @@ class WebScraper:
         """Extract contact information from a webpage"""
         contacts = []
         
+        # Every text node of the page (scripts and comments included) and every
+        # link to a LinkedIn profile, from one walk over the tree: the page text
+        # is joined from the text nodes as get_text() would, and each address is
+        # looked up among those containing an '@' instead of by a full tree search
+        text_nodes = []
+        linkedin_links = []
+        for node in soup.descendants:
+            if isinstance(node, NavigableString):
+                text_nodes.append(node)
+            elif node.name == 'a':
+                href = node.get('href')
+                if href is not None and _LINKEDIN_PROFILE_HREF.search(href):
+                    linkedin_links.append(node)
+        email_nodes = [node for node in text_nodes if '@' in node]
+        
         # Look for email addresses
-        email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        page_text = soup.get_text()
-        emails = re.findall(email_pattern, page_text)
+        page_text = ''.join(node for node in text_nodes if type(node) in soup.interesting_string_types)
+        emails = _EMAIL_ADDRESS.findall(page_text)
         
-        # Look for names near email addresses
-        for email in emails:
-            if self._is_valid_business_email(email):
+        # Look for names near email addresses, once per address: a repeat finds
+        # the same element, so it would only make a duplicate contact
+        for email in dict.fromkeys(emails):
+            if _is_valid_business_email(email):
+                # The text of the element holding the first occurrence of the address
+                email_elem = next((node for node in email_nodes if email in node), None)
+                text = email_elem.parent.get_text() if email_elem is not None and email_elem.parent else ""
+                
                 # Try to find associated name
-                name = self._find_name_near_email(soup, email)
+                name = self._find_name_near_email(text)
                 
                 contact = {
                     'email': email,
@@ -285,17 +487,16 @@ class WebScraper:
                 }
                 
                 # Try to extract job title
-                title = self._extract_job_title_near_email(soup, email)
+                title = self._extract_job_title_near_email(text)
                 if title:
                     contact['job_title'] = title
                     
                 contacts.append(contact)
                 
         # Look for LinkedIn profiles
-        linkedin_links = soup.find_all('a', href=re.compile(r'linkedin\.com/in/'))
         for link in linkedin_links:
             linkedin_url = link.get('href')
-            name = link.text.strip() or self._extract_name_from_linkedin_url(linkedin_url)
+            name = link.text.strip() or _extract_name_from_linkedin_url(linkedin_url)
             
             if name:
                 contacts.append({
@@ -306,66 +507,24 @@ class WebScraper:
                 
         return contacts
     
-    def _is_valid_business_email(self, email: str) -> bool:
-        """Check if email looks like a business email"""
-        # Skip common non-business domains
-        skip_domains = [
-            'gmail.com', 'yahoo.com', 'hotmail.com', 'outlook.com',
-            'aol.com', 'icloud.com', 'protonmail.com'
-        ]
-        
-        domain = email.split('@')[1].lower()
-        return domain not in skip_domains
-    
-    def _find_name_near_email(self, soup: BeautifulSoup, email: str) -> str:
-        """Try to find a name associated with an email address"""
-        # Look for text near the email
-        email_elem = soup.find(text=re.compile(re.escape(email)))
-        if email_elem:
-            parent = email_elem.parent
-            if parent:
-                # Look for name patterns in the same element or nearby
-                text = parent.get_text()
-                name_match = re.search(r'\b([A-Z][a-z]+ [A-Z][a-z]+)\b', text)
-                if name_match:
-                    return name_match.group(1)
+    def _find_name_near_email(self, text: str) -> str:
+        """
+        Try to find a name associated with an email address, in the text of the
+        element holding the address
+        """
+        # Look for name patterns in the same element or nearby
+        name_match = _FULL_NAME.search(text)
+        if name_match:
+            return name_match.group(1)
                     
         return ""
     
-    def _extract_job_title_near_email(self, soup: BeautifulSoup, email: str) -> str:
-        """Try to extract job title near an email"""
-        # Common job title patterns
-        title_patterns = [
-            r'\b(CEO|CTO|CFO|COO|VP|Vice President|President|Director|Manager|Lead|Head)\b',
-            r'\b(Chief Executive Officer|Chief Technology Officer|Chief Financial Officer)\b',
-            r'\b(Senior|Principal|Associate|Assistant)\s+\w+\b'
-        ]
-        
-        email_elem = soup.find(text=re.compile(re.escape(email)))
-        if email_elem:
-            parent = email_elem.parent
-            if parent:
-                text = parent.get_text()
-                for pattern in title_patterns:
-                    match = re.search(pattern, text, re.IGNORECASE)
-                    if match:
-                        return match.group(0)
+    def _extract_job_title_near_email(self, text: str) -> str:
+        """Try to extract job title near an email, from the text of the element holding it"""
+        for pattern in _JOB_TITLES:
+            match = pattern.search(text)
+            if match:
+                return match.group(0)
                         
         return ""
-    
-    def _extract_name_from_linkedin_url(self, linkedin_url: str) -> str:
-        """Extract name from LinkedIn URL"""
-        # LinkedIn URLs often contain the person's name
-        # e.g., linkedin.com/in/john-smith-123456
-        match = re.search(r'/in/([^/]+)', linkedin_url)
-        if match:
-            name_slug = match.group(1)
-            # Convert slug to name
-            name_parts = name_slug.split('-')
-            if len(name_parts) >= 2:
-                first_name = name_parts[0].capitalize()
-                last_name = name_parts[1].capitalize()
-                return f"{first_name} {last_name}"
-                
-        return ""
 